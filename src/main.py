@@ -1,60 +1,66 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
-import sqlite3
 from src.routes.rag import router as rag_router
 from src.services.retrieval import RetrievalService
+from src.services.reranker import create_reranker
 from src.services.embedding import EmbeddingService
+from src.services.embedding_cache import EmbeddingCache
+from src.services.generation import GenerationService, SYSTEM_PROMPT, RESPONSE_TOKEN_RESERVE
+from src.services.context_builder import CONTEXT_TOKEN_BUDGET, estimate_tokens
+from src.services.file_manager import FileManager
+from src.services.file_index import FileContentIndex
+from src.services.ingestion import IngestionService
+from src.services.query_cache import QueryCache
+from src.services.history_store import HistoryStore
+from src.services.intent_router import IntentRouter
+from src.services.watcher import FileWatcher
+from src.services.sessions import SessionStore
 from src.utils.logger import setup_logger
+from src.utils.concurrency import shutdown_executor, GenerationQueueTimeout
 
 logger = setup_logger()
 load_dotenv()
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 DB_PATH = os.path.join("db", "history.db")
 
-def init_db():
-    """Initialize SQLite database with history and files tables if they don't exist."""
-    os.makedirs("db", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create history table if it doesn't exist
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT NOT NULL,
-            query TEXT NOT NULL,
-            file_paths TEXT,
-            response TEXT,
-            details TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create files table if it doesn't exist
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            file_path TEXT UNIQUE NOT NULL,
-            content TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
-    logger.info("Ensured SQLite database tables exist for permanent history and files")
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up RAG system...")
-    init_db()  # Initialize database without dropping tables
-    embedding_service = EmbeddingService(OLLAMA_HOST)
-    retrieval_service = RetrievalService(embedding_service)
-    retrieval_service.load_documents()
+    os.makedirs("db", exist_ok=True)
+    app.state.history_store = HistoryStore(DB_PATH)
+    app.state.history_store.init_db()  # Initialize database without dropping tables
+    # Services are built once and shared by every request via app.state
+    embedding_service = EmbeddingService(OLLAMA_HOST, cache=EmbeddingCache(os.path.join("cache", "embeddings.db")))
+    retrieval_service = RetrievalService(embedding_service, reranker=create_reranker())
+    generation_service = GenerationService(OLLAMA_HOST, model="mistral")
+    file_manager = FileManager()
+    app.state.services = (embedding_service, retrieval_service, generation_service, file_manager)
+    app.state.file_index = FileContentIndex(embedding_service, app.state.history_store)
+    app.state.query_cache = QueryCache()
+    app.state.intent_router = IntentRouter(generation_service)
+    # Ollama's window (num_ctx) has to hold the session history plus each turn's retrieved context, system prompt and reply
+    app.state.sessions = SessionStore(token_limit=max(
+        generation_service.num_ctx - CONTEXT_TOKEN_BUDGET - estimate_tokens(SYSTEM_PROMPT) - RESPONSE_TOKEN_RESERVE, 0
+    ))
+    retrieval_service.add_change_listener(app.state.query_cache.invalidate)
+    # Index documents/ in the background; queries are served from the existing index meanwhile
+    app.state.ingestion = IngestionService(retrieval_service)
+    app.state.ingestion.start()
+    # Re-index documents/ and ALLOWED_DIRS as files change, so queries don't pay for it
+    watch_paths = ["documents"] + [d.strip() for d in os.getenv("ALLOWED_DIRS", "").split(",") if d.strip()]
+    app.state.watcher = FileWatcher(retrieval_service, watch_paths)
+    if os.getenv("WATCH_ENABLED", "true").lower() == "true":
+        app.state.watcher.start()
     yield
     logger.info("Shutting down...")
+    app.state.watcher.stop()
+    app.state.ingestion.stop()
+    # Commits any interactions still queued for the writer
+    app.state.history_store.close()
+    shutdown_executor()
 
 app = FastAPI(
     title="RAG System API",
@@ -65,6 +71,11 @@ app = FastAPI(
 
 app.include_router(rag_router)
 
+@app.exception_handler(GenerationQueueTimeout)
+async def generation_queue_timeout_handler(request: Request, exc: GenerationQueueTimeout):
+    # The model is saturated; the client can retry later
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
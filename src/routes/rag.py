@@ -1,77 +1,84 @@
-from fastapi import APIRouter, HTTPException, Depends
-from src.schema.rag import QueryRequest, AutomationRequest, QueryResponse, AutomationResponse, HistoryEntry
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from src.schema.rag import QueryRequest, BatchQueryRequest, AutomationRequest, QueryResponse, AutomationResponse, HistoryPage, FileSearchResponse, IngestionStatus
 from src.services.embedding import EmbeddingService
 from src.services.retrieval import RetrievalService
-from src.services.generation import GenerationService
+from src.services.generation import GenerationService, ERROR_HTML, SYSTEM_PROMPT
 from src.services.file_manager import FileManager
+from src.services.file_index import FileContentIndex
+from src.services.ingestion import IngestionService
+from src.services.query_cache import QueryCache
+from src.services.history_store import HistoryStore
+from src.services.intent_router import IntentRouter
+from src.services.context_builder import build_context, estimate_tokens
+from src.services.sessions import SessionStore
 from src.utils.logger import setup_logger
+from src.utils.concurrency import run_blocking, run_limited, embedding_limiter, generation_scheduler, Priority
 from dotenv import load_dotenv
 import os
 import json
-import sqlite3
-from typing import List
+import asyncio
+from typing import List, Optional
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
 load_dotenv()
 logger = setup_logger()
 router = APIRouter(prefix="/rag", tags=["rag"])
-DB_PATH = os.path.join("db", "history.db")
 
-def get_services():
-    ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-    embedding_service = EmbeddingService(ollama_host)
-    retrieval_service = RetrievalService(embedding_service)
-    generation_service = GenerationService(ollama_host, model="mistral")
-    file_manager = FileManager()
-    return embedding_service, retrieval_service, generation_service, file_manager
+def get_services(request: Request) -> tuple[EmbeddingService, RetrievalService, GenerationService, FileManager]:
+    # Built once in the app lifespan; see src/main.py
+    return request.app.state.services
 
-def store_interaction(interaction_type: str, query: str, file_paths: List[str], response: str, details: str = None):
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO history (type, query, file_paths, response, details) VALUES (?, ?, ?, ?, ?)",
-            (interaction_type, query, json.dumps(file_paths), response, details)
-        )
-        conn.commit()
-        conn.close()
-        logger.info(f"Stored {interaction_type} interaction: {query}")
-    except Exception as e:
-        logger.error(f"Failed to store {interaction_type} interaction: {str(e)}")
+def get_file_index(request: Request) -> FileContentIndex:
+    return request.app.state.file_index
 
-def store_file_content(file_path: str):
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR REPLACE INTO files (file_path, content) VALUES (?, ?)",
-            (file_path, content)
-        )
-        conn.commit()
-        conn.close()
-        logger.info(f"Stored content for file: {file_path}")
-    except Exception as e:
-        logger.error(f"Failed to store file content {file_path}: {str(e)}")
+def get_ingestion(request: Request) -> IngestionService:
+    return request.app.state.ingestion
 
-def get_db_content() -> List[str]:
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT content FROM files")
-        rows = cursor.fetchall()
-        conn.close()
-        return [row[0] for row in rows]
-    except Exception as e:
-        logger.error(f"Failed to fetch DB content: {str(e)}")
-        return []
+def get_query_cache(request: Request) -> QueryCache:
+    return request.app.state.query_cache
 
-@router.post("/query", response_model=QueryResponse)
-async def query_rag(
-    request: QueryRequest,
-    services: tuple[EmbeddingService, RetrievalService, GenerationService, FileManager] = Depends(get_services)
-):
-    embedding_service, retrieval_service, generation_service, _ = services
+def get_history_store(request: Request) -> HistoryStore:
+    return request.app.state.history_store
+
+def get_intent_router(request: Request) -> IntentRouter:
+    return request.app.state.intent_router
+
+def get_sessions(request: Request) -> SessionStore:
+    return request.app.state.sessions
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def index_attached_files(file_paths: List[str], retrieval_service: RetrievalService, file_index: FileContentIndex):
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=400, detail=f"File not found: {file_path}")
+        await run_limited(embedding_limiter, file_index.store_file, file_path)
+        await run_limited(embedding_limiter, retrieval_service.process_file, file_path)
+
+@dataclass
+class PreparedQuery:
+    query: str
+    file_paths: List[str]
+    cache_scope: tuple
+    corpus_version: tuple
+    session_id: str = ""
+    session: Optional[dict] = None
+    prompt: str = ""
+    query_embedding: Optional[List[float]] = None
+    docs: Optional[List[str]] = None
+    metas: Optional[List[dict]] = None
+    cached: Optional[dict] = None
+    timings: Optional[dict] = None
+    context: str = ""
+    prompt_tokens: int = 0
+
+async def prepare_query(request: QueryRequest, embedding_service: EmbeddingService, retrieval_service: RetrievalService,
+                        generation_service: GenerationService, file_index: FileContentIndex, query_cache: QueryCache,
+                        sessions: SessionStore) -> PreparedQuery:
+    """Validate the request and retrieve its context, or a cached response; shared by the blocking and streaming query routes."""
     query = request.query.strip()
     file_paths = [fp.strip() for fp in request.file_paths if fp.strip()]
 
@@ -80,51 +87,238 @@ async def query_rag(
 
     logger.info(f"Processing query: {query} with files: {file_paths}")
 
-    # Get previous query for context
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT query FROM history WHERE type = 'query' ORDER BY timestamp DESC LIMIT 1")
-    prev_query = cursor.fetchone()
-    prev_query = prev_query[0] if prev_query else ""
-    conn.close()
-
-    retrieved_docs, retrieved_metas = [], []
-    if file_paths:
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                raise HTTPException(status_code=400, detail=f"File not found: {file_path}")
-            store_file_content(file_path)
-            retrieval_service.process_file(file_path)
-        query_embedding = embedding_service.embed_query(query)
-        retrieved_docs, retrieved_metas = retrieval_service.retrieve(query_embedding)
-    else:
-        query_embedding = embedding_service.embed_query(query)
-        retrieved_docs, retrieved_metas = retrieval_service.retrieve(query_embedding)
+    await index_attached_files(file_paths, retrieval_service, file_index)
+
+    # Any change to the indexed data bumps this, so cached responses never outlive their sources
+    prepared = PreparedQuery(
+        query=query, file_paths=file_paths, cache_scope=(tuple(sorted(file_paths)), request.search_mode),
+        corpus_version=(retrieval_service.version, file_index.version)
+    )
+    prepared.session_id, prepared.session = sessions.get(request.session_id)
+    # Follow-ups depend on the conversation, so only a session's first query uses the shared cache
+    if prepared.session["turns"] == 0:
+        prepared.cached = query_cache.get(query, prepared.cache_scope, prepared.corpus_version)
+    if prepared.cached:
+        logger.info(f"Query cache hit: {query}")
+        return prepared
+
+    query_embedding = None
+    if request.search_mode != "keyword":
+        query_embedding = await run_limited(embedding_limiter, embedding_service.embed_query, query)
+        prepared.query_embedding = query_embedding
+        if prepared.session["turns"] == 0:
+            prepared.cached = query_cache.get_similar(query_embedding, prepared.cache_scope, prepared.corpus_version)
+        if prepared.cached:
+            return prepared
+
+    prepared.timings = {}
+    query_text = query if request.search_mode != "vector" else None
+    retrieved_docs, retrieved_metas = await run_blocking(
+        retrieval_service.retrieve, query_embedding, query_text=query_text, timings=prepared.timings,
+        rerank_text=query
+    )
+    if not file_paths and not retrieved_docs and query_embedding is not None:
+        retrieved_docs = await run_limited(embedding_limiter, file_index.search, query_embedding)
         if not retrieved_docs:
-            db_content = get_db_content()
-            if not db_content:
-                raise HTTPException(status_code=404, detail="No data available in database")
-            embeddings = embedding_service.embed_documents(db_content)
-            scores = [sum(a * b for a, b in zip(query_embedding, emb)) / (sum(a * a for a in query_embedding) ** 0.5 * sum(b * b for b in emb) ** 0.5) for emb in embeddings]
-            top_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:3]
-            retrieved_docs = [db_content[i] for i in top_indices]
-            retrieved_metas = [{"file": "Database", "source": "stored_content"}] * len(retrieved_docs)
+            raise HTTPException(status_code=404, detail="No data available in database")
+        retrieved_metas = [{"file": "Database", "source": "stored_content"}] * len(retrieved_docs)
 
     if not retrieved_docs:
         raise HTTPException(status_code=404, detail="No relevant documents found")
 
-    context = " ".join(retrieved_docs)
-    full_prompt = f"Previous query: {prev_query}\nCurrent query: {query}"
-    response = generation_service.generate(full_prompt, context)
+    # Earlier turns are already in the session's Ollama context; without it, fall back to the previous query as text
+    if prepared.session["last_query"] and not prepared.session["context"]:
+        prepared.prompt = f"Previous query: {prepared.session['last_query']}\nCurrent query: {query}"
+    else:
+        prepared.prompt = f"Current query: {query}"
+    built = build_context(query, retrieved_docs, retrieved_metas)
+    prepared.docs, prepared.metas, prepared.context = built.docs, built.metas, built.text
+    # The system prompt is sent with every turn, including session follow-ups
+    prepared.prompt_tokens = estimate_tokens(generation_service.build_prompt(prepared.prompt, prepared.context)) + estimate_tokens(SYSTEM_PROMPT)
+    return prepared
+
+def cache_response(query_cache: QueryCache, prepared: PreparedQuery, response: str):
+    if response == ERROR_HTML or prepared.session["turns"] > 0:
+        return
+    query_cache.put(
+        prepared.query, prepared.cache_scope, prepared.corpus_version, prepared.query_embedding,
+        {"response": response, "context": prepared.docs, "metadata": prepared.metas}
+    )
+
+@router.post("/query", response_model=QueryResponse)
+async def query_rag(
+    request: QueryRequest,
+    services: tuple[EmbeddingService, RetrievalService, GenerationService, FileManager] = Depends(get_services),
+    file_index: FileContentIndex = Depends(get_file_index),
+    query_cache: QueryCache = Depends(get_query_cache),
+    history_store: HistoryStore = Depends(get_history_store),
+    sessions: SessionStore = Depends(get_sessions)
+):
+    embedding_service, retrieval_service, generation_service, _ = services
+    prepared = await prepare_query(request, embedding_service, retrieval_service, generation_service, file_index, query_cache, sessions)
+    details = json.dumps({"session_id": prepared.session_id})
+    if prepared.cached:
+        sessions.record_turn(prepared.session, prepared.query, None)
+        history_store.record("query", prepared.query, prepared.file_paths, prepared.cached["response"], details)
+        return {**prepared.cached, "session_id": prepared.session_id}
+
+    # Identical first-turn queries in flight at once share one generation
+    coalesce_key = None if prepared.session["context"] else ("query", prepared.prompt, prepared.context)
+    response, session_context = await generation_scheduler.run(
+        Priority.INTERACTIVE, generation_service.generate_turn, prepared.prompt, prepared.context, prepared.session["context"],
+        key=coalesce_key
+    )
     logger.info(f"Generated response: {response}")
+    cache_response(query_cache, prepared, response)
+    sessions.record_turn(prepared.session, prepared.query, session_context)
+
+    history_store.record("query", prepared.query, prepared.file_paths, response, details)
+    return {
+        "response": response, "context": prepared.docs, "metadata": prepared.metas,
+        "timings": prepared.timings, "prompt_tokens": prepared.prompt_tokens, "session_id": prepared.session_id
+    }
+
+@router.post("/query/stream")
+async def query_rag_stream(
+    request: QueryRequest,
+    services: tuple[EmbeddingService, RetrievalService, GenerationService, FileManager] = Depends(get_services),
+    file_index: FileContentIndex = Depends(get_file_index),
+    query_cache: QueryCache = Depends(get_query_cache),
+    history_store: HistoryStore = Depends(get_history_store),
+    sessions: SessionStore = Depends(get_sessions)
+):
+    """Server-sent events: one 'context' event, then 'token' events, then a final 'done' (or 'error') event."""
+    embedding_service, retrieval_service, generation_service, _ = services
+    prepared = await prepare_query(request, embedding_service, retrieval_service, generation_service, file_index, query_cache, sessions)
+    details = json.dumps({"session_id": prepared.session_id})
+
+    async def event_stream():
+        if prepared.cached:
+            yield sse_event("context", {
+                "context": prepared.cached["context"], "metadata": prepared.cached["metadata"], "session_id": prepared.session_id
+            })
+            sessions.record_turn(prepared.session, prepared.query, None)
+            history_store.record("query", prepared.query, prepared.file_paths, prepared.cached["response"], details)
+            yield sse_event("done", {"response": prepared.cached["response"], "session_id": prepared.session_id})
+            return
+        yield sse_event("context", {
+            "context": prepared.docs, "metadata": prepared.metas, "timings": prepared.timings,
+            "prompt_tokens": prepared.prompt_tokens, "session_id": prepared.session_id
+        })
+        tokens = []
+        final = {}
+        try:
+            async with generation_scheduler.slot(Priority.INTERACTIVE):
+                async for token in generation_service.generate_stream(prepared.prompt, prepared.context, prepared.session["context"], final):
+                    tokens.append(token)
+                    yield sse_event("token", {"token": token})
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {str(e)}")
+            yield sse_event("error", {"response": ERROR_HTML})
+            return
+        response = generation_service.wrap_html("".join(tokens).strip())
+        cache_response(query_cache, prepared, response)
+        sessions.record_turn(prepared.session, prepared.query, final.get("context"))
+        history_store.record("query", prepared.query, prepared.file_paths, response, details)
+        yield sse_event("done", {"response": response, "session_id": prepared.session_id})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-    store_interaction("query", query, file_paths, response)
-    return {"response": response, "context": retrieved_docs, "metadata": retrieved_metas}
+@router.post("/query/batch")
+async def query_rag_batch(
+    request: BatchQueryRequest,
+    services: tuple[EmbeddingService, RetrievalService, GenerationService, FileManager] = Depends(get_services),
+    file_index: FileContentIndex = Depends(get_file_index),
+    query_cache: QueryCache = Depends(get_query_cache),
+    history_store: HistoryStore = Depends(get_history_store)
+):
+    """Answer many queries in one call, streamed back as NDJSON lines in completion order.
+
+    Queries are embedded in batches and retrieved with one multi-vector Chroma query; each
+    line carries the query's index in the request so clients can reorder results.
+    """
+    embedding_service, retrieval_service, generation_service, _ = services
+    queries = [query.strip() for query in request.queries]
+    file_paths = [fp.strip() for fp in request.file_paths if fp.strip()]
+    if not queries or not all(queries):
+        raise HTTPException(status_code=400, detail="Queries cannot be empty")
+
+    logger.info(f"Processing batch of {len(queries)} queries with files: {file_paths}")
+    await index_attached_files(file_paths, retrieval_service, file_index)
+
+    scope = (tuple(sorted(file_paths)), request.search_mode)
+    version = (retrieval_service.version, file_index.version)
+    cached = {i: query_cache.get(query, scope, version) for i, query in enumerate(queries)}
+    pending = [i for i, hit in cached.items() if hit is None]
+
+    embeddings = {}
+    if pending and request.search_mode != "keyword":
+        vectors = await run_limited(embedding_limiter, embedding_service.embed_documents, [queries[i] for i in pending])
+        embeddings = dict(zip(pending, vectors))
+        for i in pending:
+            cached[i] = query_cache.get_similar(embeddings[i], scope, version)
+        pending = [i for i in pending if cached[i] is None]
+
+    retrieved = {}
+    if pending:
+        results = await run_blocking(
+            retrieval_service.retrieve_many,
+            [embeddings[i] for i in pending] if embeddings else None,
+            [queries[i] for i in pending] if request.search_mode != "vector" else None,
+            rerank_texts=[queries[i] for i in pending]
+        )
+        retrieved = dict(zip(pending, results))
+
+    async def answer(i: int) -> dict:
+        if cached[i] is not None:
+            return {"index": i, "query": queries[i], "cached": True, **cached[i]}
+        docs, metas = retrieved[i]
+        if not docs:
+            return {"index": i, "query": queries[i], "error": "No relevant documents found"}
+        built = build_context(queries[i], docs, metas)
+        prompt = f"Current query: {queries[i]}"
+        response = await generation_scheduler.run(
+            Priority.BATCH, generation_service.generate, prompt, built.text, key=("generate", prompt, built.text)
+        )
+        result = {"response": response, "context": built.docs, "metadata": built.metas}
+        if response != ERROR_HTML:
+            query_cache.put(queries[i], scope, version, embeddings.get(i), result)
+        prompt_tokens = estimate_tokens(generation_service.build_prompt(prompt, built.text)) + estimate_tokens(SYSTEM_PROMPT)
+        return {"index": i, "query": queries[i], "cached": False, "prompt_tokens": prompt_tokens, **result}
+
+    async def result_stream():
+        # Every item queues at batch priority in the generation scheduler, which runs a few at a
+        # time and lets interactive queries go first; results stream as they finish
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(queries))]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                item = await next_result
+                # Recorded as each answer arrives, so a client that disconnects midway keeps its history
+                if "response" in item:
+                    history_store.record("query", item["query"], file_paths, item["response"], json.dumps({"batch_index": item["index"]}))
+                yield json.dumps(item) + "\n"
+        finally:
+            # A disconnected client closes the generator; stop generating answers nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+def bulk_summary(file_results: List[dict]) -> str:
+    failed = [r for r in file_results if not r["success"]]
+    summary = f"{len(file_results) - len(failed)} of {len(file_results)} files succeeded"
+    if failed:
+        summary += "; failed: " + ", ".join(f"{r['path']} ({r['error']})" for r in failed[:10])
+        if len(failed) > 10:
+            summary += f" and {len(failed) - 10} more"
+    return summary
 
 @router.post("/automate", response_model=AutomationResponse)
 async def automate_task(
     request: AutomationRequest,
-    services: tuple[EmbeddingService, RetrievalService, GenerationService, FileManager] = Depends(get_services)
+    services: tuple[EmbeddingService, RetrievalService, GenerationService, FileManager] = Depends(get_services),
+    history_store: HistoryStore = Depends(get_history_store),
+    intent_router: IntentRouter = Depends(get_intent_router)
 ):
     embedding_service, retrieval_service, generation_service, file_manager = services
     prompt = request.prompt.strip()
@@ -133,36 +327,33 @@ async def automate_task(
         raise HTTPException(status_code=400, detail="Prompt cannot be empty")
 
     logger.info(f"Processing automation prompt: {prompt}")
-    instruction_prompt = (
-        "You are a file management assistant. Parse the following user prompt and return a JSON object with 'task' and 'args'. "
-        "Supported tasks: create_file, read_file, update_file, delete_file, create_directory, move_file, search_files, write_article, delete_all_files. "
-        "Args can include 'file_paths' (list), 'file_path', 'dir_path', or 'pattern'. For 'write_article', use 'file_path' (supports .md or .html), 'source' (e.g., 'vector_db'), and 'content'. "
-        "Examples:\n"
-        "'Create files /path/test1.txt and /path/test2.txt with content Hello' -> {'task': 'create_file', 'args': {'file_paths': ['/path/test1.txt', '/path/test2.txt'], 'content': 'Hello'}}\n"
-        "'Write an article to /path/article.md from vector database' -> {'task': 'write_article', 'args': {'file_path': '/path/article.md', 'source': 'vector_db'}}\n"
-        "'Search for *.txt in /path/dir' -> {'task': 'search_files', 'args': {'dir_path': '/path/dir', 'pattern': '*.txt'}}\n"
-        "'Delete all files from /path/dir' -> {'task': 'delete_all_files', 'args': {'dir_path': '/path/dir'}}\n"
-        f"User prompt: {prompt}"
-    )
-    response = generation_service.client.generate(model="mistral", prompt=instruction_prompt)
-    try:
-        instruction = json.loads(response["response"])
-        task = instruction.get("task")
-        args = instruction.get("args", {})
-    except (json.JSONDecodeError, KeyError) as e:
-        logger.error(f"Failed to parse LLM response: {str(e)} - Response: {response['response']}")
-        raise HTTPException(status_code=500, detail="Failed to interpret prompt")
+    instruction = intent_router.match(prompt)
+    if instruction is None:
+        try:
+            instruction = await generation_scheduler.run(Priority.AUTOMATION, intent_router.parse_with_llm, prompt, key=("intent", prompt))
+        except ValueError:
+            raise HTTPException(status_code=500, detail="Failed to interpret prompt")
+    task = instruction.get("task")
+    args = instruction.get("args", {})
 
     file_paths = args.get("file_paths", [args.get("file_path", "")])
+    file_results = None
     if task == "write_article":
         file_path = file_paths[0]
         if "source" in args and args["source"] == "vector_db":
-            query_embedding = embedding_service.embed_query("Generate an article based on available data")
-            docs, _ = retrieval_service.retrieve(query_embedding, n_results=5)
-            content = generation_service.generate("Write an article using this data", " ".join(docs))
+            query_embedding = await run_limited(embedding_limiter, embedding_service.embed_query, "Generate an article based on available data")
+            docs, _ = await run_blocking(retrieval_service.retrieve, query_embedding, n_results=5)
+            built = build_context("Generate an article based on available data", docs, [{} for _ in docs])
+            content = await generation_scheduler.run(
+                Priority.AUTOMATION, generation_service.generate, "Write an article using this data", built.text,
+                key=("generate", "Write an article using this data", built.text)
+            )
         else:
             content_prompt = args.get("content", "")
-            content = generation_service.generate(f"Write an article {content_prompt}", "")
+            content = await generation_scheduler.run(
+                Priority.AUTOMATION, generation_service.generate, f"Write an article {content_prompt}", "",
+                key=("generate", f"Write an article {content_prompt}", "")
+            )
         
         # Format content based on file extension
         if file_path.endswith(".md"):
@@ -170,47 +361,107 @@ async def automate_task(
         elif file_path.endswith(".html"):
             content = f"<!DOCTYPE html>\n<html>\n<head><title>Article</title></head>\n<body>\n<h1>Article</h1>\n<p>{content.replace('\n', '</p>\n<p>')}</p>\n</body>\n</html>"
         
-        result = file_manager.execute_task("create_file", {"file_path": file_path, "content": content})
+        result = await run_blocking(file_manager.execute_task, "create_file", {"file_path": file_path, "content": content})
     elif task == "delete_all_files":
         dir_path = args.get("dir_path", "")
+        # Allowlist first, so responses never reveal whether a directory outside it exists
+        if dir_path and not file_manager.is_path_allowed(dir_path):
+            raise HTTPException(status_code=403, detail=f"Path not allowed: {dir_path}")
         if not dir_path or not os.path.isdir(dir_path):
             raise HTTPException(status_code=400, detail=f"Invalid directory: {dir_path}")
-        results = []
-        for filename in os.listdir(dir_path):
-            file_path = os.path.join(dir_path, filename)
-            if os.path.isfile(file_path):
-                results.append(file_manager.execute_task("delete_file", {"file_path": file_path}))
-        result = "; ".join(results) if results else "No files to delete"
-    elif task in ["create_file", "read_file", "update_file", "delete_file"]:
-        results = [file_manager.execute_task(task, {"file_path": fp, "content": args.get("content", "")}) for fp in file_paths if fp]
+        try:
+            file_results = await run_blocking(file_manager.delete_all_files, dir_path)
+        except PermissionError as e:
+            raise HTTPException(status_code=403, detail=str(e))
+        result = bulk_summary(file_results) if file_results else "No files to delete"
+    elif task in ["create_file", "update_file"]:
+        file_results = await run_blocking(file_manager.bulk_create, [(fp, args.get("content", "")) for fp in file_paths if fp])
+        result = bulk_summary(file_results)
+    elif task == "delete_file":
+        file_results = await run_blocking(file_manager.bulk_delete, [fp for fp in file_paths if fp])
+        result = bulk_summary(file_results)
+    elif task in ["move_file", "copy_file"]:
+        sources = args.get("file_paths") or [args.get("src_path", "")]
+        bulk_operation = file_manager.bulk_move if task == "move_file" else file_manager.bulk_copy
+        file_results = await run_blocking(bulk_operation, [fp for fp in sources if fp], args.get("dest_dir", ""))
+        result = bulk_summary(file_results)
+    elif task == "read_file":
+        results = [await run_blocking(file_manager.execute_task, task, {"file_path": fp}) for fp in file_paths if fp]
         result = "; ".join(results)
     elif task == "search_files":
-        result = file_manager.execute_task(task, {"dir_path": args.get("dir_path", ""), "pattern": args.get("pattern", "*")})
+        result = await run_blocking(file_manager.execute_task, task, {"dir_path": args.get("dir_path", ""), "pattern": args.get("pattern", "*")})
     else:
-        result = file_manager.execute_task(task, args)
+        result = await run_blocking(file_manager.execute_task, task, args)
 
     logger.info(f"Automation result: {result}")
     details = json.dumps({"task": task, "args": args})
-    store_interaction("automation", prompt, file_paths if task != "delete_all_files" else [args.get("dir_path", "")], result, details)
-    return {"result": result}
+    history_store.record("automation", prompt, file_paths if task != "delete_all_files" else [args.get("dir_path", "")], result, details)
+    return {"result": result, "files": file_results}
+
+def history_timestamp(value: datetime) -> str:
+    # Stored timestamps are naive UTC in SQLite's CURRENT_TIMESTAMP format
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
 
-@router.get("/history", response_model=List[HistoryEntry])
-async def get_history():
+@router.get("/history", response_model=HistoryPage)
+async def get_history(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    q: Optional[str] = None,
+    include_response: bool = True,
+    history_store: HistoryStore = Depends(get_history_store)
+):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, type, query, file_paths, response, details, timestamp FROM history ORDER BY timestamp DESC")
-        rows = cursor.fetchall()
-        conn.close()
-        history = [
-            {
-                "id": row[0], "type": row[1], "query": row[2], "file_paths": row[3],
-                "response": row[4], "details": row[5], "timestamp": row[6]
-            }
-            for row in rows
-        ]
-        logger.info(f"Fetched {len(history)} history entries")
-        return history
+        rows, next_cursor = await run_blocking(
+            history_store.fetch_history, limit, cursor, type.lower() if type else None,
+            history_timestamp(since) if since else None, history_timestamp(until) if until else None,
+            q, include_response
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to fetch history: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch history")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to fetch history")
+    history = [
+        {
+            "id": row[0], "type": row[1], "query": row[2], "file_paths": row[3],
+            "response": row[4], "details": row[5], "timestamp": row[6]
+        }
+        for row in rows
+    ]
+    logger.info(f"Fetched {len(history)} history entries")
+    return {"entries": history, "next_cursor": next_cursor}
+
+@router.get("/files/search", response_model=FileSearchResponse)
+async def search_files(
+    dir_path: str,
+    pattern: str = "*",
+    content: Optional[str] = None,
+    max_depth: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    services: tuple[EmbeddingService, RetrievalService, GenerationService, FileManager] = Depends(get_services)
+):
+    _, retrieval_service, _, file_manager = services
+    # Allowlist first, so responses never reveal whether a directory outside it exists
+    if not file_manager.is_path_allowed(dir_path):
+        raise HTTPException(status_code=403, detail=f"Path not allowed: {dir_path}")
+    if not os.path.isdir(dir_path):
+        raise HTTPException(status_code=400, detail=f"Invalid directory: {dir_path}")
+    if content:
+        files, next_offset = await run_blocking(
+            file_manager.search_content_page, dir_path, pattern, lambda paths: retrieval_service.search_content(content, paths),
+            max_depth, limit, offset
+        )
+    else:
+        paths, next_offset = await run_blocking(file_manager.search_page, dir_path, pattern, max_depth, limit, offset)
+        files = [{"path": path} for path in paths]
+    return {"files": files, "next_offset": next_offset}
+
+@router.get("/ingest/status", response_model=IngestionStatus)
+async def get_ingestion_status(ingestion: IngestionService = Depends(get_ingestion)):
+    return ingestion.status()
\ No newline at end of file
@@ -1,9 +1,18 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Literal
 
 class QueryRequest(BaseModel):
     query: str
     file_paths: List[str] = []
+    # "keyword" answers from the BM25 index alone, without an embedding call
+    search_mode: Literal["hybrid", "vector", "keyword"] = "hybrid"
+    # Continue a conversation; omitted starts a new one, returned in the response
+    session_id: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    file_paths: List[str] = []
+    search_mode: Literal["hybrid", "vector", "keyword"] = "hybrid"
 
 class AutomationRequest(BaseModel):
     prompt: str
@@ -12,15 +21,46 @@ class QueryResponse(BaseModel):
     response: str
     context: List[str]
     metadata: List[Dict[str, str]]
+    timings: Optional[Dict[str, float]] = None
+    prompt_tokens: Optional[int] = None
+    session_id: Optional[str] = None
+
+class FileOperationResult(BaseModel):
+    path: str
+    success: bool
+    error: Optional[str] = None
 
 class AutomationResponse(BaseModel):
     result: str
+    files: Optional[List[FileOperationResult]] = None
 
 class HistoryEntry(BaseModel):
     id: int
     type: str
     query: str
     file_paths: str
-    response: str
+    response: Optional[str]
     details: Optional[str]
-    timestamp: str
\ No newline at end of file
+    timestamp: str
+
+class HistoryPage(BaseModel):
+    entries: List[HistoryEntry]
+    next_cursor: Optional[str] = None
+
+class FileMatch(BaseModel):
+    path: str
+    snippet: Optional[str] = None
+
+class FileSearchResponse(BaseModel):
+    files: List[FileMatch]
+    next_offset: Optional[int] = None
+
+class IngestionStatus(BaseModel):
+    state: str
+    total: int
+    processed: int
+    skipped: int
+    failed: int
+    current: List[str]
+    started_at: Optional[float]
+    finished_at: Optional[float]
\ No newline at end of file
@@ -0,0 +1,123 @@
+import os
+import re
+import math
+from dataclasses import dataclass, field
+from src.services.retrieval import CHUNK_OVERLAP
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2048"))
+# Keep only the sentences that best match the query instead of whole chunks
+CONTEXT_SENTENCES_ONLY = os.getenv("CONTEXT_SENTENCES_ONLY", "false").lower() == "true"
+# Anything shorter than this is not worth a partial chunk at the end of the budget
+MIN_PARTIAL_TOKENS = 32
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+WORD = re.compile(r"\w+")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Llama/Mistral-style tokenizers, about four characters per token."""
+    return math.ceil(len(text) / 4)
+
+@dataclass
+class BuiltContext:
+    text: str
+    docs: list[str] = field(default_factory=list)
+    metas: list[dict] = field(default_factory=list)
+    tokens: int = 0
+
+def _strip_overlap(previous: str, chunk: str) -> str:
+    """chunk without the prefix it shares with the end of previous (the splitter's chunk overlap)."""
+    probe = chunk[:32]
+    if len(probe) < 32:
+        return chunk
+    start = previous.find(probe, max(len(previous) - CHUNK_OVERLAP * 2, 0))
+    while start != -1:
+        if chunk.startswith(previous[start:]):
+            return chunk[len(previous) - start:]
+        start = previous.find(probe, start + 1)
+    return chunk
+
+def _overlap_length(chunk: str, following: str) -> int:
+    """Length of the suffix of chunk that following starts with."""
+    return len(following) - len(_strip_overlap(chunk, following))
+
+def _dedupe(docs: list[str], metas: list[dict]) -> list[tuple[str, dict]]:
+    kept = []
+    for doc, meta in zip(docs, metas):
+        if any(doc == other or doc in other for other, _ in kept):
+            continue
+        # Chunks of the same file can overlap at either end, depending on retrieval order
+        for other, other_meta in kept:
+            if other_meta.get("file") == meta.get("file"):
+                doc = _strip_overlap(other, doc)
+                doc = doc[:len(doc) - _overlap_length(doc, other)]
+        if doc.strip():
+            kept.append((doc, meta))
+    return kept
+
+def _truncate(text: str, max_tokens: int) -> str:
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    return cut[:boundary + 1] if boundary > limit // 2 else cut
+
+def _top_sentences(query: str, chunks: list[tuple[str, dict]], budget: int) -> list[tuple[str, dict]]:
+    terms = {term.lower() for term in WORD.findall(query)}
+    sentences = []
+    for chunk_index, (doc, _) in enumerate(chunks):
+        for sentence in SENTENCE_BOUNDARY.split(doc):
+            words = [word.lower() for word in WORD.findall(sentence)]
+            if not words:
+                continue
+            # Query-term density, favouring earlier (better retrieved) chunks on ties
+            score = sum(word in terms for word in words) / math.sqrt(len(words)) - chunk_index * 1e-3
+            sentences.append((score, chunk_index, len(sentences), sentence.strip()))
+    selected, used = [], 0
+    for score, chunk_index, position, sentence in sorted(sentences, reverse=True):
+        tokens = estimate_tokens(sentence)
+        if score <= 0 or used + tokens > budget:
+            continue
+        selected.append((chunk_index, position, sentence))
+        used += tokens
+    # Back to reading order, one passage per chunk
+    passages = {}
+    for chunk_index, _, sentence in sorted(selected):
+        passages.setdefault(chunk_index, []).append(sentence)
+    return [(" ".join(passages[i]), chunks[i][1]) for i in sorted(passages)]
+
+def build_context(query: str, docs: list[str], metas: list[dict], token_budget: int = None,
+                  sentences_only: bool = None) -> BuiltContext:
+    """Fit retrieved chunks, best first, into a token budget.
+
+    Overlap repeated between chunks of the same file is sent once; the last chunk that fits
+    only partly is cut at a sentence boundary, and chunks past the budget are dropped.
+    """
+    budget = token_budget or CONTEXT_TOKEN_BUDGET
+    sentences_only = CONTEXT_SENTENCES_ONLY if sentences_only is None else sentences_only
+    chunks = _dedupe(docs, metas)
+    if sentences_only:
+        chunks = _top_sentences(query, chunks, budget) or chunks
+    kept, used = [], 0
+    for doc, meta in chunks:
+        remaining = budget - used
+        tokens = estimate_tokens(doc)
+        if tokens > remaining:
+            if remaining < MIN_PARTIAL_TOKENS:
+                break
+            doc = _truncate(doc, remaining)
+            tokens = estimate_tokens(doc)
+        kept.append((doc, meta))
+        used += tokens
+    built = BuiltContext(
+        text="\n\n".join(doc for doc, _ in kept),
+        docs=[doc for doc, _ in kept],
+        metas=[meta for _, meta in kept],
+    )
+    built.tokens = estimate_tokens(built.text)
+    saved = sum(estimate_tokens(doc) for doc in docs) - built.tokens
+    logger.info(f"Built context of {built.tokens} tokens from {len(docs)} chunks ({saved} tokens trimmed)")
+    return built
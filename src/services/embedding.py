@@ -1,17 +1,66 @@
-from ollama import Client as OllamaClient
+import os
+from concurrent.futures import ThreadPoolExecutor
+from ollama import ResponseError
+from src.utils.ollama_client import create_client
+from src.services.embedding_cache import EmbeddingCache
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
 
 class EmbeddingService:
-    def __init__(self, host: str):
-        self.client = OllamaClient(host=host)
+    def __init__(self, host: str, batch_size: int = None, max_concurrency: int = None, cache: EmbeddingCache = None):
+        self.client = create_client(host)
         self.model = "nomic-embed-text"
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE", "32"))
+        self.max_concurrency = max_concurrency or int(os.getenv("EMBED_CONCURRENCY", "4"))
+        # None until the server has been probed; older Ollama servers have no /api/embed
+        self._batch_supported = None
+        self.cache = cache
+
+    def _embed_one(self, text: str) -> list[float]:
+        response = self.client.embeddings(model=self.model, prompt=text)
+        return response["embedding"]
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        if self._batch_supported is not False:
+            try:
+                response = self.client.embed(model=self.model, input=texts)
+                self._batch_supported = True
+                return response["embeddings"]
+            except ResponseError as e:
+                if e.status_code != 404:
+                    raise
+                logger.warning("Ollama server does not support batched embeddings, falling back to per-text requests")
+                self._batch_supported = False
+        return [self._embed_one(text) for text in texts]
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        embeddings = []
-        for text in texts:
-            response = self.client.embeddings(model=self.model, prompt=text)
-            embeddings.append(response["embedding"])
+        if not texts:
+            return []
+        if not self.cache:
+            return self._embed_uncached(texts)
+        embeddings = self.cache.get_many(self.model, texts)
+        # Identical texts are embedded once, even when they repeat within this call
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing:
+            fresh = dict(zip(missing, self._embed_uncached(missing)))
+            self.cache.put_many(self.model, missing, [fresh[text] for text in missing])
+            embeddings = [embedding if embedding is not None else fresh[text] for text, embedding in zip(texts, embeddings)]
+        logger.info(f"Embedding cache served {len(texts) - len(missing)} of {len(texts)} texts")
+        return embeddings
+
+    def _embed_uncached(self, texts: list[str]) -> list[list[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        # Executor.map yields results in submission order, so output lines up with input
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            results = executor.map(self._embed_batch, batches)
+            embeddings = [embedding for batch in results for embedding in batch]
+        logger.info(f"Embedded {len(texts)} texts in {len(batches)} batches")
         return embeddings
 
     def embed_query(self, text: str) -> list[float]:
-        response = self.client.embeddings(model=self.model, prompt=text)
-        return response["embedding"]
\ No newline at end of file
+        if not self.cache:
+            return self._embed_one(text)
+        return self.embed_documents([text])[0]
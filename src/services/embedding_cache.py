@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from array import array
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class EmbeddingCache:
+    """Embeddings keyed by (model, SHA-256 of text), stored as float32 blobs in one SQLite file with LRU eviction."""
+
+    def __init__(self, path: str = os.path.join("cache", "embeddings.db"), max_entries: int = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries or int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Return cached vectors in input order, None for misses."""
+        hashes = [self._hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found],
+                )
+                self._conn.commit()
+        return [found.get(text_hash) for text_hash in hashes]
+
+    def put_many(self, model: str, texts: list[str], vectors: list[list[float]]):
+        if not texts:
+            return
+        now = time.time()
+        rows = {self._hash(text): array("f", vector).tobytes() for text, vector in zip(texts, vectors)}
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, text_hash, blob, now) for text_hash, blob in rows.items()],
+            )
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop the least recently used tenth beyond the limit so eviction runs rarely
+        excess = self._count - int(self.max_entries * 0.9)
+        cursor = self._conn.execute(
+            "DELETE FROM embeddings WHERE (model, text_hash) IN "
+            "(SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count -= cursor.rowcount
+        logger.info(f"Evicted {excess} least recently used embeddings from cache")
@@ -0,0 +1,131 @@
+import os
+import zlib
+import sqlite3
+import threading
+import numpy as np
+from src.services.embedding import EmbeddingService
+from src.services.history_store import HistoryStore
+from src.services.retrieval import get_file_hash
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class FileContentIndex:
+    """Stored file contents from the SQLite files table, searchable by embedding.
+
+    Each file is embedded once when stored; the vectors are kept in memory as one
+    normalized float32 matrix so a fallback search is a single matrix-vector product.
+    Contents are stored zlib-compressed and keyed by hash, so an unchanged file is never
+    rewritten and a copy of an already stored file reuses its content and embedding.
+    """
+
+    def __init__(self, embedding_service: EmbeddingService, store: HistoryStore):
+        self.embedding_service = embedding_service
+        self.store = store
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._row_ids = []
+        # Bumped on every write so caches keyed on it go stale
+        self.version = 0
+
+    @staticmethod
+    def decode_content(content) -> str:
+        # Rows written before compression hold plain text
+        return zlib.decompress(content).decode("utf-8") if isinstance(content, bytes) else content
+
+    def store_file(self, file_path: str):
+        try:
+            stat = os.stat(file_path)
+            with self.store.connection() as conn:
+                stored = conn.execute(
+                    "SELECT content_hash, file_size, file_mtime FROM files WHERE file_path = ?", (file_path,)
+                ).fetchone()
+            if stored and stored[1] == stat.st_size and stored[2] == stat.st_mtime_ns:
+                return
+            file_hash = get_file_hash(file_path)
+            if stored and stored[0] == file_hash:
+                # Touched but not modified; remember the new stat so the next check skips hashing
+                with self.store.connection() as conn:
+                    conn.execute(
+                        "UPDATE files SET file_size = ?, file_mtime = ? WHERE file_path = ?",
+                        (stat.st_size, stat.st_mtime_ns, file_path)
+                    )
+                    conn.commit()
+                return
+            with self.store.connection() as conn:
+                duplicate = conn.execute(
+                    "SELECT content, embedding FROM files WHERE content_hash = ? AND embedding IS NOT NULL LIMIT 1", (file_hash,)
+                ).fetchone()
+            if duplicate:
+                content, embedding = duplicate
+            else:
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        text = f.read()
+                except UnicodeDecodeError:
+                    # Binary formats (PDF, DOCX) are still recorded, with an empty embedding that
+                    # keeps them out of searches, so the unchanged check can skip them next time
+                    text = None
+                content = zlib.compress((text or "").encode("utf-8"))
+                embedding = b"" if text is None else np.asarray(self.embedding_service.embed_query(text), dtype=np.float32).tobytes()
+            with self.store.connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (file_path, content, embedding, content_hash, file_size, file_mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                    (file_path, content, embedding, file_hash, stat.st_size, stat.st_mtime_ns)
+                )
+                conn.commit()
+            with self._lock:
+                self._matrix = None
+                self.version += 1
+            if embedding:
+                logger.info(f"Stored content for file: {file_path}")
+            else:
+                logger.info(f"Recorded non-text file without searchable content: {file_path}")
+        except Exception as e:
+            logger.error(f"Failed to store file content {file_path}: {str(e)}")
+
+    def _backfill_embeddings(self, conn: sqlite3.Connection):
+        # Rows written before embeddings were stored alongside the content
+        rows = conn.execute("SELECT id, content FROM files WHERE embedding IS NULL").fetchall()
+        if not rows:
+            return
+        embeddings = self.embedding_service.embed_documents([self.decode_content(row[1]) for row in rows])
+        conn.executemany(
+            "UPDATE files SET embedding = ? WHERE id = ?",
+            [(np.asarray(emb, dtype=np.float32).tobytes(), row[0]) for row, emb in zip(rows, embeddings)]
+        )
+        conn.commit()
+        logger.info(f"Backfilled embeddings for {len(rows)} stored files")
+
+    def _load(self):
+        with self.store.connection() as conn:
+            self._backfill_embeddings(conn)
+            rows = conn.execute("SELECT id, embedding FROM files WHERE length(embedding) > 0").fetchall()
+        if not rows:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+            self._row_ids = []
+            return
+        matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.maximum(norms, 1e-12)
+        self._row_ids = [row[0] for row in rows]
+
+    def search(self, query_embedding: list[float], top_k: int = 3) -> list[str]:
+        """Contents of the top_k stored files by cosine similarity, best first."""
+        with self._lock:
+            if self._matrix is None:
+                self._load()
+            matrix, row_ids = self._matrix, self._row_ids
+        if not row_ids:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = matrix @ (query / max(np.linalg.norm(query), 1e-12))
+        k = min(top_k, len(row_ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = [row_ids[i] for i in top]
+
+        placeholders = ",".join("?" * len(ids))
+        with self.store.connection() as conn:
+            contents = dict(conn.execute(f"SELECT id, content FROM files WHERE id IN ({placeholders})", ids).fetchall())
+        return [self.decode_content(contents[i]) for i in ids if i in contents]
@@ -1,6 +1,9 @@
 import os
 import shutil
-import glob
+import fnmatch
+from itertools import islice
+from typing import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from src.utils.logger import setup_logger
 from dotenv import load_dotenv
 
@@ -11,15 +14,20 @@ class FileManager:
     def __init__(self):
         allowed_dirs = os.getenv("ALLOWED_DIRS", "").split(",")
         self.allowed_dirs = [os.path.abspath(d.strip()) for d in allowed_dirs if d.strip()] if allowed_dirs else None
+        self.search_workers = int(os.getenv("SEARCH_WORKERS", "8"))
+        self.search_max_depth = int(os.getenv("SEARCH_MAX_DEPTH", "8"))
+        self.search_max_results = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+        self._search_pool = ThreadPoolExecutor(max_workers=self.search_workers, thread_name_prefix="file-search")
+        self._io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("FILE_IO_WORKERS", "8")), thread_name_prefix="file-io")
 
-    def _is_path_allowed(self, path: str) -> bool:
+    def is_path_allowed(self, path: str) -> bool:
         if not self.allowed_dirs:
             return True
         abs_path = os.path.abspath(path)
         return any(abs_path.startswith(allowed_dir) for allowed_dir in self.allowed_dirs)
 
     def create_file(self, file_path: str, content: str = "") -> bool:
-        if not self._is_path_allowed(file_path):
+        if not self.is_path_allowed(file_path):
             logger.error(f"Path not allowed: {file_path}")
             return False
         try:
@@ -33,7 +41,7 @@ class FileManager:
             return False
 
     def read_file(self, file_path: str) -> str:
-        if not self._is_path_allowed(file_path):
+        if not self.is_path_allowed(file_path):
             logger.error(f"Path not allowed: {file_path}")
             return ""
         if not os.path.exists(file_path):
@@ -49,7 +57,7 @@ class FileManager:
             return ""
 
     def update_file(self, file_path: str, content: str) -> bool:
-        if not self._is_path_allowed(file_path):
+        if not self.is_path_allowed(file_path):
             logger.error(f"Path not allowed: {file_path}")
             return False
         try:
@@ -63,7 +71,7 @@ class FileManager:
             return False
 
     def delete_file(self, file_path: str) -> bool:
-        if not self._is_path_allowed(file_path):
+        if not self.is_path_allowed(file_path):
             logger.error(f"Path not allowed: {file_path}")
             return False
         if not os.path.exists(file_path):
@@ -78,7 +86,7 @@ class FileManager:
             return False
 
     def create_directory(self, dir_path: str) -> bool:
-        if not self._is_path_allowed(dir_path):
+        if not self.is_path_allowed(dir_path):
             logger.error(f"Path not allowed: {dir_path}")
             return False
         try:
@@ -90,7 +98,7 @@ class FileManager:
             return False
 
     def move_file(self, src_path: str, dest_dir: str) -> bool:
-        if not (self._is_path_allowed(src_path) and self._is_path_allowed(dest_dir)):
+        if not (self.is_path_allowed(src_path) and self.is_path_allowed(dest_dir)):
             logger.error(f"Path not allowed: {src_path} or {dest_dir}")
             return False
         if not os.path.exists(src_path):
@@ -106,22 +114,176 @@ class FileManager:
             logger.error(f"Failed to move file {src_path}: {str(e)}")
             return False
 
-    def search_files(self, dir_path: str, pattern: str) -> list[str]:
-        if not self._is_path_allowed(dir_path):
+    def _run_bulk(self, operation: str, items: list[tuple], action: Callable, invalid: dict[int, str]) -> list[dict]:
+        """Run action(*item) for every valid item on the I/O pool; one result dict per item, in input order."""
+        def run(item):
+            try:
+                action(*item)
+                return None
+            except Exception as e:
+                return str(e)
+        valid = [i for i in range(len(items)) if i not in invalid]
+        errors = dict(zip(valid, self._io_pool.map(run, [items[i] for i in valid])))
+        errors.update(invalid)
+        results = [{"path": items[i][0], "success": errors[i] is None, "error": errors[i]} for i in range(len(items))]
+        failed = [r for r in results if not r["success"]]
+        logger.info(f"Bulk {operation}: {len(results) - len(failed)} succeeded, {len(failed)} failed")
+        for result in failed[:10]:
+            logger.error(f"Bulk {operation} failed for {result['path']}: {result['error']}")
+        return results
+
+    def _disallowed(self, paths: list[str]) -> dict[int, str]:
+        return {i: "Path not allowed" for i, path in enumerate(paths) if not self.is_path_allowed(path)}
+
+    @staticmethod
+    def _write(file_path: str, content: str):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def bulk_create(self, files: list[tuple[str, str]]) -> list[dict]:
+        """Create or overwrite (file_path, content) pairs."""
+        return self._run_bulk("create", files, self._write, self._disallowed([path for path, _ in files]))
+
+    def bulk_delete(self, file_paths: list[str]) -> list[dict]:
+        invalid = self._disallowed(file_paths)
+        for i, path in enumerate(file_paths):
+            if i not in invalid and not os.path.isfile(path):
+                invalid[i] = "File not found"
+        return self._run_bulk("delete", [(path,) for path in file_paths], os.remove, invalid)
+
+    def _transfer_checks(self, file_paths: list[str], dest_dir: str) -> dict[int, str]:
+        if not self.is_path_allowed(dest_dir):
+            return {i: f"Destination not allowed: {dest_dir}" for i in range(len(file_paths))}
+        invalid = self._disallowed(file_paths)
+        names = {}
+        for i, path in enumerate(file_paths):
+            if i in invalid:
+                continue
+            if not os.path.isfile(path):
+                invalid[i] = "File not found"
+            elif os.path.basename(path) in names:
+                # Two sources with the same name would overwrite each other in dest_dir
+                invalid[i] = f"Duplicate file name in batch: {file_paths[names[os.path.basename(path)]]}"
+            else:
+                names[os.path.basename(path)] = i
+        if len(invalid) == len(file_paths):
+            return invalid
+        try:
+            os.makedirs(dest_dir, exist_ok=True)
+        except OSError as e:
+            return {i: str(e) for i in range(len(file_paths))}
+        return invalid
+
+    def bulk_move(self, file_paths: list[str], dest_dir: str) -> list[dict]:
+        invalid = self._transfer_checks(file_paths, dest_dir)
+        return self._run_bulk("move", [(path, os.path.join(dest_dir, os.path.basename(path))) for path in file_paths], shutil.move, invalid)
+
+    def bulk_copy(self, file_paths: list[str], dest_dir: str) -> list[dict]:
+        invalid = self._transfer_checks(file_paths, dest_dir)
+        return self._run_bulk("copy", [(path, os.path.join(dest_dir, os.path.basename(path))) for path in file_paths], shutil.copy2, invalid)
+
+    def delete_all_files(self, dir_path: str) -> list[dict]:
+        """Delete every regular file directly inside dir_path; raises PermissionError if dir_path is not allowed."""
+        if not self.is_path_allowed(dir_path):
             logger.error(f"Path not allowed: {dir_path}")
-            return []
-        if not os.path.exists(dir_path):
+            raise PermissionError(f"Path not allowed: {dir_path}")
+        with os.scandir(dir_path) as entries:
+            file_paths = [entry.path for entry in entries if entry.is_file()]
+        return self.bulk_delete(file_paths)
+
+    @staticmethod
+    def _pattern_parts(pattern: str) -> list[str]:
+        return [part for part in pattern.replace("\\", "/").split("/") if part not in ("", ".")]
+
+    @staticmethod
+    def _matches(root: str, path: str, parts: list[str]) -> bool:
+        """A single-part pattern matches file names at any depth; a pattern with a separator
+        matches the path relative to root component by component, like glob."""
+        if len(parts) == 1:
+            return fnmatch.fnmatch(os.path.basename(path), parts[0])
+        relative = os.path.relpath(path, root).replace(os.sep, "/").split("/")
+        return len(relative) == len(parts) and all(fnmatch.fnmatch(name, part) for name, part in zip(relative, parts))
+
+    @classmethod
+    def _scan_directory(cls, root: str, dir_path: str, parts: list[str]) -> tuple[list[str], list[str]]:
+        # scandir entries carry the file type, so no extra stat per entry
+        matches, subdirs = [], []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and cls._matches(root, entry.path, parts):
+                        matches.append(entry.path)
+        except OSError as e:
+            logger.warning(f"Skipping unreadable directory {dir_path}: {str(e)}")
+        return sorted(matches), sorted(subdirs)
+
+    def iter_files(self, dir_path: str, pattern: str = "*", max_depth: int = None) -> Iterator[str]:
+        """Files under dir_path whose names match pattern, breadth first.
+
+        A pattern containing a separator, such as "sub/*.txt", matches paths relative to dir_path.
+        Each level's directories are scanned in parallel in slices, and results come out in a
+        stable order so offsets can page through them. max_depth 0 searches dir_path only.
+        """
+        max_depth = self.search_max_depth if max_depth is None else max_depth
+        parts = self._pattern_parts(pattern) or ["*"]
+        if len(parts) > 1:
+            # Nothing deeper than the pattern itself can match
+            max_depth = min(max_depth, len(parts) - 1)
+        level, depth = [dir_path], 0
+        while level:
+            next_level = []
+            for start in range(0, len(level), self.search_workers * 4):
+                scans = self._search_pool.map(lambda d: self._scan_directory(dir_path, d, parts), level[start:start + self.search_workers * 4])
+                for matches, subdirs in scans:
+                    yield from matches
+                    next_level.extend(subdirs)
+            depth += 1
+            level = next_level if depth <= max_depth else []
+
+    def search_page(self, dir_path: str, pattern: str, max_depth: int = None, limit: int = None,
+                    offset: int = 0) -> tuple[list[str], int | None]:
+        """One page of search_files results and the offset of the next page (None on the last page)."""
+        if not self.is_path_allowed(dir_path):
+            logger.error(f"Path not allowed: {dir_path}")
+            return [], None
+        if not os.path.isdir(dir_path):
             logger.error(f"Directory not found: {dir_path}")
-            return []
+            return [], None
+        limit = limit or self.search_max_results
         try:
-            # Use glob for pattern matching (e.g., "*.txt")
-            files = glob.glob(os.path.join(dir_path, pattern))
-            files = [f for f in files if os.path.isfile(f)]  # Filter to files only
-            logger.info(f"Found files matching {pattern} in {dir_path}: {files}")
-            return files
+            files = list(islice(self.iter_files(dir_path, pattern or "*", max_depth), offset, offset + limit + 1))
+            logger.info(f"Found {min(len(files), limit)} files matching {pattern} in {dir_path} from offset {offset}")
+            return files[:limit], offset + limit if len(files) > limit else None
         except Exception as e:
             logger.error(f"Failed to search files in {dir_path} with pattern {pattern}: {str(e)}")
-            return []
+            return [], None
+
+    def search_content_page(self, dir_path: str, pattern: str, matcher: Callable[[list[str]], dict[str, str]],
+                            max_depth: int = None, limit: int = None, offset: int = 0) -> tuple[list[dict], int | None]:
+        """Like search_page, keeping only files for which matcher returns a snippet.
+
+        matcher is called with batches of candidate paths, so an index lookup serves many files at once.
+        """
+        if not self.is_path_allowed(dir_path) or not os.path.isdir(dir_path):
+            logger.error(f"Path not allowed or not a directory: {dir_path}")
+            return [], None
+        limit = limit or self.search_max_results
+        matches = []
+        candidates = self.iter_files(dir_path, pattern or "*", max_depth)
+        while len(matches) <= offset + limit:
+            batch = list(islice(candidates, 200))
+            if not batch:
+                break
+            snippets = matcher(batch)
+            matches.extend({"path": path, "snippet": snippets[path]} for path in batch if path in snippets)
+        logger.info(f"Found {len(matches[offset:offset + limit])} files with matching content in {dir_path} from offset {offset}")
+        return matches[offset:offset + limit], offset + limit if len(matches) > offset + limit else None
+
+    def search_files(self, dir_path: str, pattern: str, max_depth: int = None, limit: int = None, offset: int = 0) -> list[str]:
+        return self.search_page(dir_path, pattern, max_depth, limit, offset)[0]
 
     def execute_task(self, task: str, args: dict) -> str:
         task = task.lower()
@@ -135,11 +297,16 @@ class FileManager:
             return "Success" if self.delete_file(args.get("file_path", "")) else "Failed"
         elif task == "create_directory":
             return "Success" if self.create_directory(args.get("dir_path", "")) else "Failed"
+        elif task == "copy_file":
+            results = self.bulk_copy([args.get("src_path", "")], args.get("dest_dir", ""))
+            return "Success" if results[0]["success"] else "Failed"
         elif task == "move_file":
             return "Success" if self.move_file(args.get("src_path", ""), args.get("dest_dir", "")) else "Failed"
         elif task == "search_files":
-            files = self.search_files(args.get("dir_path", ""), args.get("pattern", ""))
-            return f"Found: {', '.join(files)}" if files else "No files found"
+            files, next_offset = self.search_page(args.get("dir_path", ""), args.get("pattern", ""))
+            if not files:
+                return "No files found"
+            return f"Found: {', '.join(files)}" + (f" (first {len(files)} results)" if next_offset is not None else "")
         else:
             logger.warning(f"Unknown task: {task}")
             return "Task not recognized"
\ No newline at end of file
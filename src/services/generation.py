@@ -1,49 +1,91 @@
-import ollama
+import os
+from typing import AsyncIterator
 from src.utils.logger import setup_logger
+from src.utils.ollama_client import create_client, create_async_client
 
 logger = setup_logger()
 
+ERROR_HTML = (
+    "<!DOCTYPE html>"
+    "<html lang='en'><body>"
+    "<h1>Error</h1>"
+    "<p>An error occurred while generating the response.</p>"
+    "</body></html>"
+)
+
+# Sent as the system prompt so every request shares the same prefix, which Ollama keeps evaluated
+SYSTEM_PROMPT = (
+    "Generate a structured HTML response to the query based on the context. "
+    "Use proper HTML tags like <h1> for the main heading, <p> for paragraphs, "
+    "<ul> or <ol> for lists if applicable, and <strong> or <em> for emphasis. "
+    "Ensure the response is concise, well-formatted, and visually organized. "
+    "Return only the HTML content without any additional text or comments."
+)
+
+# Room left in the context window for the model's reply when sizing session history
+RESPONSE_TOKEN_RESERVE = 1024
+
 class GenerationService:
     def __init__(self, ollama_host: str, model: str = "mistral"):
-        self.client = ollama.Client(host=ollama_host)
+        self.client = create_client(ollama_host)
+        self.async_client = create_async_client(ollama_host)
         self.model = model
+        # Keeps the model and its evaluated prefix loaded between requests
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        # Set explicitly: the server default (2048 or 4096) would silently cut session history from the front
+        self.num_ctx = int(os.getenv("OLLAMA_NUM_CTX", "8192"))
 
-    def generate(self, query: str, context: str) -> str:
-        # Updated prompt to request structured HTML output
-        prompt = (
-            f"Context: {context}\n\n"
-            f"Query: {query}\n\n"
-            "Generate a structured HTML response to the query based on the context. "
-            "Use proper HTML tags like <h1> for the main heading, <p> for paragraphs, "
-            "<ul> or <ol> for lists if applicable, and <strong> or <em> for emphasis. "
-            "Ensure the response is concise, well-formatted, and visually organized. "
-            "Return only the HTML content without any additional text or comments."
+    def build_prompt(self, query: str, context: str) -> str:
+        return f"Context: {context}\n\nQuery: {query}"
+
+    def _request_options(self, session_context: list[int] | None) -> dict:
+        options = {"system": SYSTEM_PROMPT, "keep_alive": self.keep_alive, "options": {"num_ctx": self.num_ctx}}
+        if session_context:
+            # Ollama resumes from the previous turn's evaluated tokens and only evaluates the new prompt
+            options["context"] = session_context
+        return options
+
+    def wrap_html(self, html_response: str) -> str:
+        # Wrap the response in a basic HTML structure for robustness
+        return (
+            "<!DOCTYPE html>"
+            "<html lang='en'>"
+            "<head><meta charset='UTF-8'><style>"
+            "body { font-family: 'Poppins', sans-serif; margin: 0; padding: 0; }"
+            "h1 { font-size: 1.5rem; color: #a94f0a; margin-bottom: 10px; }"
+            "p { margin: 5px 0; line-height: 1.5; }"
+            "ul, ol { margin: 10px 0 10px 20px; color: #c07600; }"
+            "strong { color: #9d660d; }"
+            "em { color: #388e3c; }"
+            "</style></head>"
+            f"<body>{html_response}</body>"
+            "</html>"
         )
+
+    def generate(self, query: str, context: str) -> str:
+        return self.generate_turn(query, context)[0]
+
+    def generate_turn(self, query: str, context: str, session_context: list[int] = None) -> tuple[str, list[int] | None]:
+        """Generate a response, continuing from session_context when given; returns the response and the new context."""
+        prompt = self.build_prompt(query, context)
         try:
-            response = self.client.generate(model=self.model, prompt=prompt)
-            html_response = response["response"].strip()
-            # Wrap the response in a basic HTML structure for robustness
-            full_html = (
-                "<!DOCTYPE html>"
-                "<html lang='en'>"
-                "<head><meta charset='UTF-8'><style>"
-                "body { font-family: 'Poppins', sans-serif; margin: 0; padding: 0; }"
-                "h1 { font-size: 1.5rem; color: #a94f0a; margin-bottom: 10px; }"
-                "p { margin: 5px 0; line-height: 1.5; }"
-                "ul, ol { margin: 10px 0 10px 20px; color: #c07600; }"
-                "strong { color: #9d660d; }"
-                "em { color: #388e3c; }"
-                "</style></head>"
-                f"<body>{html_response}</body>"
-                "</html>"
-            )
-            return full_html
+            response = self.client.generate(model=self.model, prompt=prompt, **self._request_options(session_context))
+            logger.info(f"Generated with {response.get('prompt_eval_count', 0)} prompt tokens evaluated")
+            return self.wrap_html(response["response"].strip()), response.get("context")
         except Exception as e:
             logger.error(f"Generation failed: {str(e)}")
-            return (
-                "<!DOCTYPE html>"
-                "<html lang='en'><body>"
-                "<h1>Error</h1>"
-                "<p>An error occurred while generating the response.</p>"
-                "</body></html>"
-            )
\ No newline at end of file
+            return ERROR_HTML, None
+
+    async def generate_stream(self, query: str, context: str, session_context: list[int] = None,
+                              final: dict = None) -> AsyncIterator[str]:
+        """Yield response tokens as Ollama emits them; errors propagate to the caller.
+
+        When final is given, the context returned by the last chunk is stored in final["context"].
+        """
+        prompt = self.build_prompt(query, context)
+        stream = await self.async_client.generate(model=self.model, prompt=prompt, stream=True, **self._request_options(session_context))
+        async for part in stream:
+            if part.get("response"):
+                yield part["response"]
+            if part.get("done") and final is not None:
+                final["context"] = part.get("context")
@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import base64
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class HistoryStore:
+    """SQLite store for interaction history and stored files.
+
+    Connections come from a small pool and the database runs in WAL mode, so readers never
+    block on writers. Interactions are appended to an in-memory queue and group-committed by
+    a writer thread, so requests never wait on an fsync.
+    """
+
+    def __init__(self, db_path: str = os.path.join("db", "history.db"), pool_size: int = None,
+                 batch_size: int = None, flush_interval: float = None):
+        self.db_path = db_path
+        self.pool_size = pool_size or int(os.getenv("HISTORY_POOL_SIZE", "4"))
+        self.batch_size = batch_size or int(os.getenv("HISTORY_BATCH_SIZE", "64"))
+        self.flush_interval = flush_interval or float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5"))
+        self._pool = queue.Queue()
+        for _ in range(self.pool_size):
+            self._pool.put(self._connect())
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL with synchronous=NORMAL stays consistent after a crash and skips an fsync per commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def init_db(self):
+        """Create the history and files tables and their indexes if they don't exist."""
+        with self.connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    file_paths TEXT,
+                    response TEXT,
+                    details TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE IF NOT EXISTS files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_path TEXT UNIQUE NOT NULL,
+                    content TEXT NOT NULL,
+                    embedding BLOB,
+                    content_hash TEXT,
+                    file_size INTEGER,
+                    file_mtime INTEGER,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_history_type_timestamp ON history(type, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+            """)
+            has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                    query, response, content='history', content_rowid='id'
+                );
+                CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+                    INSERT INTO history_fts(rowid, query, response) VALUES (new.id, new.query, new.response);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+                    INSERT INTO history_fts(history_fts, rowid, query, response) VALUES ('delete', old.id, old.query, old.response);
+                END;
+            """)
+            if not has_fts:
+                # Index rows written before full-text search existed
+                conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+            # Databases created before embeddings and content hashes were stored with file contents
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(files)").fetchall()]
+            for column, column_type in (("embedding", "BLOB"), ("content_hash", "TEXT"), ("file_size", "INTEGER"), ("file_mtime", "INTEGER")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE files ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files(content_hash)")
+            conn.commit()
+        logger.info("Ensured SQLite database tables exist for permanent history and files")
+
+    def record(self, interaction_type: str, query: str, file_paths: list[str], response: str, details: str = None):
+        """Queue an interaction for the writer thread; returns immediately."""
+        # Timestamp at enqueue time so ordering reflects when the request happened, not when it was flushed
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self._writes.put((interaction_type, query, json.dumps(file_paths), response, details, timestamp))
+
+    def record_many(self, entries: list[tuple]):
+        for interaction_type, query, file_paths, response, details in entries:
+            self.record(interaction_type, query, file_paths, response, details)
+
+    def _write_loop(self):
+        while True:
+            batch, markers = [], []
+            item = self._writes.get()
+            stop = item is None
+            # Group-commit whatever else arrives within the flush interval; a flush marker commits at once
+            try:
+                while not stop:
+                    if isinstance(item, threading.Event):
+                        markers.append(item)
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._writes.get(timeout=self.flush_interval)
+                    stop = item is None
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    with self.connection() as conn:
+                        conn.executemany(
+                            "INSERT INTO history (type, query, file_paths, response, details, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                            batch
+                        )
+                        conn.commit()
+                    logger.info(f"Stored {len(batch)} interactions")
+                except Exception as e:
+                    logger.error(f"Failed to store {len(batch)} interactions: {str(e)}")
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every interaction queued before this call has been committed.
+
+        Later writes are not waited for, so this returns even while interactions keep arriving.
+        """
+        if not self._writer.is_alive():
+            return
+        marker = threading.Event()
+        self._writes.put(marker)
+        marker.wait()
+
+    def close(self):
+        self._writes.put(None)
+        self._writer.join(timeout=10)
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    @staticmethod
+    def encode_cursor(timestamp: str, entry_id: int) -> str:
+        return base64.urlsafe_b64encode(f"{timestamp}|{entry_id}".encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[str, int]:
+        try:
+            timestamp, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+            return timestamp, int(entry_id)
+        except Exception:
+            raise ValueError(f"Invalid history cursor: {cursor}")
+
+    def fetch_history(self, limit: int = 50, cursor: str = None, interaction_type: str = None,
+                      since: str = None, until: str = None, text: str = None,
+                      include_response: bool = True) -> tuple[list[tuple], str | None]:
+        """One page of history, newest first, and the cursor for the next page (None on the last page).
+
+        Pages are keyed on (timestamp, id), which the timestamp indexes cover, so every page
+        costs the same however deep it is.
+        """
+        conditions, params = [], []
+        if cursor:
+            timestamp, entry_id = self.decode_cursor(cursor)
+            conditions.append("(timestamp, id) < (?, ?)")
+            params += [timestamp, entry_id]
+        if interaction_type:
+            conditions.append("type = ?")
+            params.append(interaction_type)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if text:
+            # Quote each term so user input is never parsed as FTS5 syntax; terms are ANDed
+            terms = [term.replace('"', '""') for term in text.split() if re.search(r"\w", term)]
+            if terms:
+                conditions.append("id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+                params.append(" ".join(f'"{term}"' for term in terms))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        response_column = "response" if include_response else "NULL"
+        self.flush()
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, type, query, file_paths, {response_column}, details, timestamp FROM history {where} "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        next_cursor = self.encode_cursor(rows[limit - 1][6], rows[limit - 1][0]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src.services.retrieval import RetrievalService, spool_chunks, read_spool, get_file_hash
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class IngestionService:
+    """Indexes the documents directory in the background while the API keeps serving.
+
+    Parsing runs in a process pool that spools each file's chunks to a temporary file,
+    which is then streamed through the batched embedder so memory per file stays bounded.
+    Each file is recorded in the retrieval manifest only after its chunks are written,
+    so a restart after a crash skips finished files and redoes the rest.
+    """
+
+    def __init__(self, retrieval_service: RetrievalService, documents_dir: str = "documents", workers: int = None):
+        self.retrieval_service = retrieval_service
+        self.documents_dir = documents_dir
+        self.workers = workers or int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 2)))
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._status = {
+            "state": "idle", "total": 0, "processed": 0, "skipped": 0, "failed": 0,
+            "current": [], "started_at": None, "finished_at": None,
+        }
+
+    def status(self) -> dict:
+        with self._lock:
+            return {**self._status, "current": list(self._status["current"])}
+
+    def _update(self, **changes):
+        with self._lock:
+            self._status.update(changes)
+
+    def _increment(self, key: str, file_path: str = None):
+        with self._lock:
+            self._status[key] += 1
+            if file_path in self._status["current"]:
+                self._status["current"].remove(file_path)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingestion", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def _candidate_files(self) -> list[str]:
+        files = []
+        for filename in sorted(os.listdir(self.documents_dir)):
+            file_path = os.path.join(self.documents_dir, filename)
+            if os.path.isfile(file_path) and os.path.splitext(filename)[1].lower() in self.retrieval_service.supported_types:
+                files.append(file_path)
+        return files
+
+    def _run(self):
+        if not os.path.exists(self.documents_dir):
+            os.makedirs(self.documents_dir)
+            logger.warning(f"Created empty documents directory at {self.documents_dir}")
+            return
+        self._update(state="running", started_at=time.time(), finished_at=None, processed=0, skipped=0, failed=0, current=[])
+        try:
+            self.retrieval_service.sync_lexical_index()
+            files = self._candidate_files()
+            self._update(total=len(files))
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                in_flight = {}
+                queue = iter(files)
+                while not self._stop.is_set():
+                    # Keep a bounded number of parsed files waiting for embedding
+                    while len(in_flight) < self.workers * 2:
+                        file_path = next(queue, None)
+                        if file_path is None:
+                            break
+                        try:
+                            file_stat = os.stat(file_path)
+                            if self.retrieval_service.is_unchanged(file_path, file_stat):
+                                self._increment("skipped")
+                                continue
+                            file_hash = get_file_hash(file_path)
+                        except OSError as e:
+                            logger.error(f"Failed to read {file_path}: {str(e)}")
+                            self._increment("failed")
+                            continue
+                        if self.retrieval_service.confirm_unchanged(file_path, file_hash, file_stat):
+                            self._increment("skipped")
+                            continue
+                        in_flight[pool.submit(spool_chunks, file_path)] = (file_path, file_hash, file_stat)
+                        with self._lock:
+                            self._status["current"].append(file_path)
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        file_path, file_hash, file_stat = in_flight.pop(future)
+                        spool_path = None
+                        try:
+                            spool_path = future.result()
+                            self.retrieval_service.index_chunks(file_path, file_hash, read_spool(spool_path), file_stat)
+                            self._increment("processed", file_path)
+                        except Exception as e:
+                            logger.error(f"Failed to process {file_path}: {str(e)}")
+                            self._increment("failed", file_path)
+                        finally:
+                            if spool_path and os.path.exists(spool_path):
+                                os.remove(spool_path)
+                if self._stop.is_set():
+                    for future in in_flight:
+                        future.cancel()
+            # The pool has drained; remove spools parsed after a stop was requested
+            for future in in_flight:
+                if not future.cancelled() and future.exception() is None and os.path.exists(future.result()):
+                    os.remove(future.result())
+            status = self.status()
+            self._update(state="stopped" if self._stop.is_set() else "completed", finished_at=time.time())
+            logger.info(f"Ingestion finished: {status['processed']} indexed, {status['skipped']} unchanged, {status['failed']} failed")
+        except Exception as e:
+            logger.error(f"Ingestion failed: {str(e)}")
+            self._update(state="failed", finished_at=time.time())
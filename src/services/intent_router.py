@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+from src.services.generation import GenerationService
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+INSTRUCTION_PROMPT = (
+    "You are a file management assistant. Parse the following user prompt and return a JSON object with 'task' and 'args'. "
+    "Supported tasks: create_file, read_file, update_file, delete_file, create_directory, move_file, copy_file, search_files, write_article, delete_all_files. "
+    "Args can include 'file_paths' (list), 'file_path', 'dir_path', 'dest_dir' (for move_file and copy_file), or 'pattern'. For 'write_article', use 'file_path' (supports .md or .html), 'source' (e.g., 'vector_db'), and 'content'. "
+    "Examples:\n"
+    "'Create files /path/test1.txt and /path/test2.txt with content Hello' -> {'task': 'create_file', 'args': {'file_paths': ['/path/test1.txt', '/path/test2.txt'], 'content': 'Hello'}}\n"
+    "'Write an article to /path/article.md from vector database' -> {'task': 'write_article', 'args': {'file_path': '/path/article.md', 'source': 'vector_db'}}\n"
+    "'Search for *.txt in /path/dir' -> {'task': 'search_files', 'args': {'dir_path': '/path/dir', 'pattern': '*.txt'}}\n"
+    "'Delete all files from /path/dir' -> {'task': 'delete_all_files', 'args': {'dir_path': '/path/dir'}}\n"
+    "User prompt: {prompt}"
+)
+
+# A single path: a bare token or a quoted path that may contain spaces
+PATH = r"(?:\"[^\"]+\"|'[^']+'|[^\s,'\"]+)"
+# A path that cannot be an ordinary word: quoted, containing a separator, or starting with ~ or .
+# Intents that write, move or delete require these, so stray prose never becomes a target
+TARGET = r"(?:\"[^\"]+\"|'[^']+'|[~.][^\s,'\"]*|[^\s,'\"]*[/\\][^\s,'\"]*)"
+# A glob or file name for search: has a wildcard or an extension, unlike "files" or "documents"
+SEARCH_PATTERN = r"[^\s'\"]*[*?\[.][^\s'\"]*"
+
+PATH_SEPARATOR = r"\s*,\s*(?:and\s+)?|\s+and\s+"
+# One or more paths joined by commas and/or "and"; any other prose means the LLM is needed
+PATHS = rf"{PATH}(?:(?:{PATH_SEPARATOR}){PATH})*"
+TARGETS = rf"{TARGET}(?:(?:{PATH_SEPARATOR}){TARGET})*"
+# Each path in a PATHS match; quoted paths stay whole even if they contain "and" or commas
+PATH_ITEM = re.compile(rf"{PATH}(?=(?:{PATH_SEPARATOR})|$)", re.I)
+
+# Phrasings of the tasks FileManager.execute_task supports, tried in order; first match wins
+GRAMMAR = [
+    ("write_article", re.compile(rf"^write\s+(?:an?\s+)?article\s+(?:to|in|at)\s+(?P<file_path>{TARGET})\s+(?:from|using)\s+(?:the\s+)?(?P<source>vector)\s+(?:database|db)$", re.I)),
+    ("write_article", re.compile(rf"^write\s+(?:an?\s+)?article\s+(?:to|in|at)\s+(?P<file_path>{TARGET})(?:\s+(?P<content>(?:about|on)\s+.+))?$", re.I)),
+    ("delete_all_files", re.compile(rf"^(?:delete|remove)\s+all\s+(?:the\s+)?files\s+(?:from|in)\s+(?P<dir_path>{TARGET})$", re.I)),
+    ("create_directory", re.compile(rf"^(?:create|make)\s+(?:a\s+|the\s+)?(?:new\s+)?(?:directory|folder|dir)\s+(?P<dir_path>{TARGET})$", re.I)),
+    ("create_file", re.compile(rf"^(?:create|make)\s+(?:a\s+|the\s+)?(?:new\s+)?files?\s+(?P<file_paths>{TARGETS})(?:\s+with\s+(?:the\s+)?content\s+(?P<content>.*))?$", re.I | re.S)),
+    ("update_file", re.compile(rf"^(?:update|overwrite)\s+(?:the\s+)?files?\s+(?P<file_paths>{TARGETS})\s+with\s+(?:the\s+)?content\s+(?P<content>.*)$", re.I | re.S)),
+    ("read_file", re.compile(rf"^(?:read|show|open)\s+(?:the\s+)?files?\s+(?P<file_paths>{PATHS})$", re.I)),
+    ("delete_file", re.compile(rf"^(?:delete|remove)\s+(?:the\s+)?files?\s+(?P<file_paths>{TARGETS})$", re.I)),
+    ("move_file", re.compile(rf"^move\s+(?:the\s+)?(?:files?\s+)?(?P<file_paths>{TARGETS})\s+(?:to|into)\s+(?P<dest_dir>{TARGET})$", re.I)),
+    ("copy_file", re.compile(rf"^copy\s+(?:the\s+)?(?:files?\s+)?(?P<file_paths>{TARGETS})\s+(?:to|into)\s+(?P<dest_dir>{TARGET})$", re.I)),
+    ("search_files", re.compile(rf"^(?:search|find|look)\s+(?:for\s+)?(?P<pattern>{SEARCH_PATTERN})\s+(?:files\s+)?in\s+(?P<dir_path>{PATH})$", re.I)),
+]
+
+def _clean_path(path: str) -> str:
+    return path.strip().strip("'\"")
+
+def parse_intent(prompt: str) -> dict | None:
+    """Parse a prompt with the task grammar; None when no phrasing matches."""
+    text = prompt.strip().rstrip(".")
+    for task, pattern in GRAMMAR:
+        match = pattern.match(text)
+        if not match:
+            continue
+        args = {key: value for key, value in match.groupdict().items() if value is not None}
+        if "file_paths" in args:
+            args["file_paths"] = [_clean_path(path) for path in PATH_ITEM.findall(args["file_paths"]) if _clean_path(path)]
+        for key in ("file_path", "dir_path", "src_path", "dest_dir"):
+            if key in args:
+                args[key] = _clean_path(args[key])
+        if "source" in args:
+            args["source"] = "vector_db"
+        return {"task": task, "args": args}
+    return None
+
+class IntentRouter:
+    """Turns automation prompts into {'task', 'args'} instructions.
+
+    The compiled grammar handles the documented phrasings without a model call; anything
+    else goes to the LLM. Results are cached by prompt either way.
+    """
+
+    def __init__(self, generation_service: GenerationService, max_entries: int = None):
+        self.generation_service = generation_service
+        self.max_entries = max_entries or int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "256"))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, prompt: str, instruction: dict):
+        with self._lock:
+            self._cache[prompt] = instruction
+            self._cache.move_to_end(prompt)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def match(self, prompt: str) -> dict | None:
+        """Cached or grammar-parsed instruction, or None when the LLM is needed."""
+        with self._lock:
+            if prompt in self._cache:
+                self._cache.move_to_end(prompt)
+                return self._cache[prompt]
+        instruction = parse_intent(prompt)
+        if instruction is not None:
+            logger.info(f"Parsed automation prompt without LLM: {instruction['task']}")
+            self._remember(prompt, instruction)
+        return instruction
+
+    def parse_with_llm(self, prompt: str) -> dict:
+        response = self.generation_service.client.generate(model=self.generation_service.model, prompt=INSTRUCTION_PROMPT.replace("{prompt}", prompt))
+        try:
+            instruction = json.loads(response["response"])
+            if not isinstance(instruction, dict) or not isinstance(instruction.get("task"), str):
+                raise ValueError("missing task")
+            instruction.setdefault("args", {})
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            logger.error(f"Failed to parse LLM response: {str(e)} - Response: {response['response']}")
+            raise ValueError("Failed to interpret prompt")
+        self._remember(prompt, instruction)
+        return instruction
@@ -0,0 +1,87 @@
+import re
+import json
+import sqlite3
+import threading
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class LexicalIndex:
+    """On-disk BM25 inverted index over chunk text, backed by SQLite FTS5.
+
+    Rows are addressed by the same chunk ids as the Chroma collection so both stay in sync.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunk_rows (
+                rowid INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                metadata TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+                content, content='chunk_rows', content_rowid='rowid'
+            );
+            CREATE TRIGGER IF NOT EXISTS chunk_rows_ai AFTER INSERT ON chunk_rows BEGIN
+                INSERT INTO chunk_fts(rowid, content) VALUES (new.rowid, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunk_rows_ad AFTER DELETE ON chunk_rows BEGIN
+                INSERT INTO chunk_fts(chunk_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END;
+        """)
+        self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunk_rows").fetchone()[0]
+
+    def add(self, ids: list[str], documents: list[str], metadatas: list[dict]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunk_rows (chunk_id, metadata, content) VALUES (?, ?, ?)",
+                [(cid, json.dumps(meta), doc) for cid, doc, meta in zip(ids, documents, metadatas)]
+            )
+            self._conn.commit()
+
+    def update_metadata(self, ids: list[str], metadatas: list[dict]):
+        # Metadata is not indexed, so the FTS table needs no change
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunk_rows SET metadata = ? WHERE chunk_id = ?",
+                [(json.dumps(meta), cid) for cid, meta in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunk_rows WHERE chunk_id = ?", [(cid,) for cid in ids])
+            self._conn.commit()
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        # Each whitespace-separated term becomes a quoted phrase, so identifiers such as
+        # "ERR-404" or "report.pdf" match as token sequences and FTS5 syntax is never interpreted
+        terms = [term.replace('"', '""') for term in query.split() if re.search(r"\w", term)]
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, str, dict, float]]:
+        """Top chunks by BM25 as (chunk_id, document, metadata, score), best first."""
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT r.chunk_id, r.content, r.metadata, bm25(chunk_fts) AS score
+                FROM chunk_fts JOIN chunk_rows r ON r.rowid = chunk_fts.rowid
+                WHERE chunk_fts MATCH ?
+                ORDER BY score LIMIT ?
+                """,
+                (expression, limit)
+            ).fetchall()
+        # FTS5 bm25() is lower-is-better; negate so higher is better like similarity scores
+        return [(cid, content, json.loads(meta), -score) for cid, content, meta, score in rows]
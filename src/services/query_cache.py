@@ -0,0 +1,88 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class QueryCache:
+    """LRU + TTL cache of query responses.
+
+    Entries are keyed by normalized query, a scope (attached files, search mode) and the
+    corpus version, so any change to the indexed data makes older entries unreachable.
+    Near-duplicate lookups, off unless a similarity threshold is set, compare the query
+    embedding against entries with the same scope and version.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, similarity_threshold: float = None):
+        self.max_entries = max_entries or int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "512"))
+        self.ttl = ttl or float(os.getenv("QUERY_CACHE_TTL", "3600"))
+        # 0 (the default) serves exact matches only; queries that differ in one file name or number
+        # can embed almost identically, so near-duplicate matching is opt-in
+        self.similarity_threshold = similarity_threshold if similarity_threshold is not None else float(os.getenv("QUERY_CACHE_SIMILARITY", "0"))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _key(self, query: str, scope: tuple, version) -> tuple:
+        return (self.normalize(query), scope, version)
+
+    def _expired(self, entry: dict) -> bool:
+        return time.time() - entry["created"] > self.ttl
+
+    def get(self, query: str, scope: tuple, version) -> dict | None:
+        key = self._key(query, scope, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["result"]
+
+    def get_similar(self, query_embedding: list[float], scope: tuple, version) -> dict | None:
+        if self.similarity_threshold <= 0:
+            return None
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if key[1] == scope and key[2] == version and entry["embedding"] is not None and not self._expired(entry)
+            ]
+            if not candidates:
+                return None
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query /= max(np.linalg.norm(query), 1e-12)
+            scores = np.vstack([entry["embedding"] for _, entry in candidates]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            logger.info(f"Query cache near-duplicate hit (similarity {scores[best]:.3f}): {key[0]}")
+            return entry["result"]
+
+    def put(self, query: str, scope: tuple, version, query_embedding: list[float] | None, result: dict):
+        # Keyword-only queries have no embedding and are only reachable by exact match
+        embedding = None
+        if query_embedding is not None:
+            embedding = np.asarray(query_embedding, dtype=np.float32)
+            embedding /= max(np.linalg.norm(embedding), 1e-12)
+        key = self._key(query, scope, version)
+        with self._lock:
+            self._entries[key] = {"result": result, "embedding": embedding, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            if self._entries:
+                logger.info(f"Invalidated {len(self._entries)} cached query responses")
+            self._entries.clear()
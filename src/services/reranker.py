@@ -0,0 +1,114 @@
+import os
+import re
+import math
+from collections import Counter
+import numpy as np
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+WORD = re.compile(r"\w+")
+# Function words carry no topical signal but dominate BM25 over a handful of candidates
+STOPWORDS = frozenset("""
+a an and are as at be but by can could do does did for from had has have how i if in is it its
+me my not of on or our should so than that the their them then there these they this to was we
+were what when where which who why will with would you your
+""".split())
+
+def _terms(text: str) -> list[str]:
+    return [term.lower() for term in WORD.findall(text)]
+
+class LexicalReranker:
+    """BM25 over the candidate set itself: cheap, dependency-free and good at exact identifiers."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, docs: list[str]) -> list[float]:
+        query_terms = set(_terms(query)) - STOPWORDS
+        if not docs or not query_terms:
+            return [0.0] * len(docs)
+        doc_terms = [Counter(_terms(doc)) for doc in docs]
+        average_length = sum(sum(terms.values()) for terms in doc_terms) / len(docs) or 1.0
+        idf = {}
+        for term in query_terms:
+            containing = sum(term in terms for terms in doc_terms)
+            idf[term] = math.log(1 + (len(docs) - containing + 0.5) / (containing + 0.5))
+        scores = []
+        for terms in doc_terms:
+            length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                frequency = terms.get(term, 0)
+                if not frequency:
+                    continue
+                score += idf[term] * frequency * (self.k1 + 1) / (frequency + self.k1 * (1 - self.b + self.b * length / average_length))
+            scores.append(score)
+        return scores
+
+class OnnxCrossEncoder:
+    """A small cross-encoder (e.g. ms-marco-MiniLM) exported to ONNX, run on CPU with onnxruntime.
+
+    Query/candidate pairs are scored in batches of batch_size in a single session call each.
+    """
+
+    def __init__(self, model_path: str, tokenizer_path: str, batch_size: int = None, max_length: int = 512):
+        import onnxruntime
+        from tokenizers import Tokenizer
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size or int(os.getenv("RERANKER_BATCH_SIZE", "16"))
+
+    def score(self, query: str, docs: list[str]) -> list[float]:
+        scores = []
+        for start in range(0, len(docs), self.batch_size):
+            encodings = self.tokenizer.encode_batch([(query, doc) for doc in docs[start:start + self.batch_size]])
+            inputs = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            logits = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+            # Single-logit models score relevance directly; two-class models put it in the last column
+            scores.extend((logits[:, -1] if logits.ndim == 2 else logits).tolist())
+        return scores
+
+def create_reranker():
+    """Reranker selected by RERANKER: "none" (default), "lexical" or "onnx"."""
+    kind = os.getenv("RERANKER", "none").lower()
+    if kind == "none":
+        return None
+    if kind == "onnx":
+        try:
+            return OnnxCrossEncoder(os.getenv("RERANKER_MODEL", "models/reranker.onnx"), os.getenv("RERANKER_TOKENIZER", "models/tokenizer.json"))
+        except Exception as e:
+            logger.warning(f"ONNX reranker unavailable ({str(e)}); using lexical reranking")
+    return LexicalReranker()
+
+def mmr(docs: list[str], scores: list[float], k: int, diversity: float) -> list[int]:
+    """Indices of k docs chosen by maximal marginal relevance.
+
+    Relevance is the reranker score scaled to [0, 1]; redundancy is word-set Jaccard overlap
+    with the docs already chosen. diversity 0 keeps pure relevance order.
+    """
+    if not docs:
+        return []
+    low, high = min(scores), max(scores)
+    relevance = [(score - low) / (high - low) if high > low else 1.0 for score in scores]
+    term_sets = [set(_terms(doc)) for doc in docs]
+    selected, remaining = [], list(range(len(docs)))
+    while remaining and len(selected) < k:
+        def marginal(i):
+            redundancy = max(
+                (len(term_sets[i] & term_sets[j]) / (len(term_sets[i] | term_sets[j]) or 1) for j in selected),
+                default=0.0
+            )
+            return (1 - diversity) * relevance[i] - diversity * redundancy
+        best = max(remaining, key=marginal)
+        selected.append(best)
+        remaining.remove(best)
+    return selected
@@ -1,151 +1,450 @@
 import os
-import pickle
+import json
+import sqlite3
 import hashlib
+import tempfile
+import threading
+import time
+from itertools import islice
+from typing import Iterable, Iterator
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import chromadb
 from src.services.embedding import EmbeddingService
+from src.services.lexical_index import LexicalIndex
+from src.services.reranker import mmr
+from src.services.vector_store import QuantizedVectorStore
 from src.utils.logger import setup_logger
 from PyPDF2 import PdfReader
 from docx import Document
 
 logger = setup_logger()
 
+SUPPORTED_TYPES = {".txt", ".pdf", ".docx"}
+CHUNK_SIZE = 2500  # ≈ 400-450 words ≈ 500-675 tokens ≈ 1-1.5 pages
+CHUNK_OVERLAP = 250  # ≈ 40-50 words ≈ 50-75 tokens ≈ 0.5-1 page
+# Text is split in windows of this many characters, so memory per file stays bounded
+SPLIT_WINDOW = CHUNK_SIZE * 8
+HASH_BLOCK_SIZE = 1 << 20
+# Reciprocal-rank fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+
+def _iter_segments(file_path: str) -> Iterator[tuple[str, dict]]:
+    """Yield (text, metadata) per paragraph or page without loading the whole document text."""
+    if file_path.endswith(".txt"):
+        # Fixed-size reads, so a file without line breaks is never held whole; iter_chunks
+        # carries the text across block boundaries
+        with open(file_path, "r", encoding="utf-8") as file:
+            while block := file.read(SPLIT_WINDOW):
+                yield block, {"file": file_path, "source": "text"}
+    elif file_path.endswith(".pdf"):
+        reader = PdfReader(file_path)
+        for i, page in enumerate(reader.pages):
+            page_text = page.extract_text()
+            if page_text:
+                yield page_text + " ", {"file": file_path, "source": f"page_{i+1}"}
+    elif file_path.endswith(".docx"):
+        doc = Document(file_path)
+        for i, paragraph in enumerate(doc.paragraphs):
+            if paragraph.text:
+                yield paragraph.text + " ", {"file": file_path, "source": f"paragraph_{i+1}"}
+
+def _locate_chunks(buffer: str, chunks: list[str], spans: list[tuple[int, dict]]) -> list[tuple[int, dict]]:
+    """Start offset of each chunk in buffer and the metadata of the segment it starts in."""
+    located = []
+    cursor = 0
+    span_index = 0
+    for chunk in chunks:
+        start = buffer.find(chunk, cursor)
+        if start == -1:
+            start = cursor
+        while span_index + 1 < len(spans) and spans[span_index + 1][0] <= start:
+            span_index += 1
+        located.append((start, spans[span_index][1]))
+        cursor = start + 1
+    return located
+
+def iter_chunks(file_path: str) -> Iterator[tuple[str, dict]]:
+    """Extract and split a file incrementally, yielding (chunk, metadata) pairs."""
+    if not os.path.exists(file_path):
+        logger.error(f"File not found: {file_path}")
+        return
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    buffer = ""
+    spans = []  # (offset in buffer, metadata) for each segment in the buffer
+    emitted = 0
+    for text, meta in _iter_segments(file_path):
+        spans.append((len(buffer), meta))
+        buffer += text
+        if len(buffer) < SPLIT_WINDOW:
+            continue
+        chunks = splitter.split_text(buffer)
+        if len(chunks) < 2:
+            continue
+        located = _locate_chunks(buffer, chunks, spans)
+        # Emit all but the last chunk; it restarts the buffer so it can merge with the text that follows
+        for chunk, (_, chunk_meta) in zip(chunks[:-1], located[:-1]):
+            yield chunk, chunk_meta
+        emitted += len(chunks) - 1
+        carry_from, carry_meta = located[-1]
+        # Always make progress, even if the splitter altered the last chunk's text. The splitter
+        # strips whitespace, so the last chunk ends where the buffer's text does, not at its end
+        carry_from = max(carry_from, len(buffer.rstrip()) - len(chunks[-1]))
+        buffer = buffer[carry_from:]
+        spans = [(0, carry_meta)] + [(offset - carry_from, m) for offset, m in spans if offset > carry_from]
+
+    if buffer.strip():
+        chunks = splitter.split_text(buffer)
+        for chunk, (_, chunk_meta) in zip(chunks, _locate_chunks(buffer, chunks, spans)):
+            yield chunk, chunk_meta
+        emitted += len(chunks)
+    if not emitted:
+        logger.warning(f"No text extracted from {file_path}")
+
+def spool_chunks(file_path: str) -> str:
+    """Write a file's chunks to a temporary JSON-lines file. Runs in ingestion worker processes."""
+    fd, spool_path = tempfile.mkstemp(prefix="rag-spool-", suffix=".jsonl")
+    with os.fdopen(fd, "w", encoding="utf-8") as spool:
+        for chunk, meta in iter_chunks(file_path):
+            spool.write(json.dumps({"text": chunk, "meta": meta}) + "\n")
+    return spool_path
+
+def read_spool(spool_path: str) -> Iterator[tuple[str, dict]]:
+    with open(spool_path, "r", encoding="utf-8") as spool:
+        for line in spool:
+            record = json.loads(line)
+            yield record["text"], record["meta"]
+
+def get_file_hash(file_path: str) -> str:
+    """Compute SHA-256 hash of file content, reading it in fixed-size blocks."""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
 class RetrievalService:
-    def __init__(self, embedding_service: EmbeddingService, db_path: str = "./chroma_db", cache_dir: str = "./cache"):
+    def __init__(self, embedding_service: EmbeddingService, db_path: str = None, reranker=None):
         self.embedding_service = embedding_service
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.collection = self.client.get_or_create_collection(name="rag_collection", metadata={"hnsw:space": "cosine"})
-        self.cache_dir = cache_dir
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-        self.supported_types = {".txt", ".pdf", ".docx"}
-
-    def _get_file_hash(self, file_path: str) -> str:
-        """Compute SHA-256 hash of file content."""
-        hasher = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            hasher.update(f.read())
-        return hasher.hexdigest()
-
-    def process_file(self, file_path: str) -> list[str]:
+        # Optional second stage; see src/services/reranker.py
+        self.reranker = reranker
+        self.rerank_candidates = int(os.getenv("RERANK_CANDIDATES", "20"))
+        # 0 disables MMR; higher values trade relevance for less redundant chunks
+        self.mmr_diversity = float(os.getenv("MMR_DIVERSITY", "0"))
+        # "chroma" (default) or "quantized", the built-in mmap'd int8 store; each keeps its own directory
+        self.backend = os.getenv("VECTOR_BACKEND", "chroma").lower()
+        if self.backend == "quantized":
+            db_path = db_path or "./vector_db"
+            self.collection = QuantizedVectorStore(db_path)
+        else:
+            db_path = db_path or "./chroma_db"
+            self.client = chromadb.PersistentClient(path=db_path)
+            self.collection = self.client.get_or_create_collection(name="rag_collection", metadata={"hnsw:space": "cosine"})
+        self.supported_types = SUPPORTED_TYPES
+        # Files whose chunks are fully written, so interrupted indexing is redone on the next pass.
+        # Lives next to the vector store so deleting its directory (or switching backend) re-indexes everything.
+        self._manifest_lock = threading.Lock()
+        self._manifest = sqlite3.connect(os.path.join(db_path, "manifest.db"), check_same_thread=False)
+        self._manifest.execute("""
+            CREATE TABLE IF NOT EXISTS indexed_files (
+                file_path TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                file_size INTEGER,
+                file_mtime INTEGER,
+                indexed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Manifests written before the stat-based skip
+        columns = [row[1] for row in self._manifest.execute("PRAGMA table_info(indexed_files)").fetchall()]
+        for column in ("file_size", "file_mtime"):
+            if column not in columns:
+                self._manifest.execute(f"ALTER TABLE indexed_files ADD COLUMN {column} INTEGER")
+        self._manifest.commit()
+        # BM25 index over the same chunk ids, for exact identifiers that dense search misses
+        self.lexical_index = LexicalIndex(os.path.join(db_path, "lexical.db"))
+        self._file_locks = {}
+        self._file_locks_guard = threading.Lock()
+        # Bumped whenever the collection changes, so caches keyed on it go stale
+        self.version = 0
+        self._change_listeners = []
+
+    def add_change_listener(self, listener):
+        self._change_listeners.append(listener)
+
+    def _notify_change(self):
+        self.version += 1
+        for listener in self._change_listeners:
+            listener()
+
+    def sync_lexical_index(self, page_size: int = 1000):
+        """Backfill the BM25 index from the vector store for collections indexed before it existed."""
+        if self.lexical_index.count() or not self.collection.count():
+            return
+        offset = 0
+        while True:
+            page = self.collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            if not page["ids"]:
+                break
+            default_meta = {"file": "unknown", "source": "unknown"}
+            self.lexical_index.add(page["ids"], page["documents"], [meta or default_meta for meta in page["metadatas"]])
+            offset += len(page["ids"])
+        logger.info(f"Backfilled lexical index with {offset} chunks")
+
+    def _file_lock(self, file_path: str) -> threading.Lock:
+        # Serialize indexing of the same file between ingestion and request handlers
+        with self._file_locks_guard:
+            return self._file_locks.setdefault(os.path.abspath(file_path), threading.Lock())
+
+    def indexed_file_hash(self, file_path: str) -> str | None:
+        with self._manifest_lock:
+            row = self._manifest.execute("SELECT file_hash FROM indexed_files WHERE file_path = ?", (file_path,)).fetchone()
+        return row[0] if row else None
+
+    def _indexed_state(self, file_path: str) -> tuple | None:
+        with self._manifest_lock:
+            return self._manifest.execute(
+                "SELECT file_hash, chunk_count, file_size, file_mtime FROM indexed_files WHERE file_path = ?", (file_path,)
+            ).fetchone()
+
+    def _mark_indexed(self, file_path: str, file_hash: str, chunk_count: int, file_stat: os.stat_result = None):
+        # The stat is taken before hashing, so a write racing the indexer changes mtime and is picked up next time
+        size, mtime = (file_stat.st_size, file_stat.st_mtime_ns) if file_stat else (None, None)
+        with self._manifest_lock:
+            self._manifest.execute(
+                "INSERT OR REPLACE INTO indexed_files (file_path, file_hash, chunk_count, file_size, file_mtime) VALUES (?, ?, ?, ?, ?)",
+                (file_path, file_hash, chunk_count, size, mtime)
+            )
+            self._manifest.commit()
+
+    def is_unchanged(self, file_path: str, file_stat: os.stat_result) -> bool:
+        """True if the file's size and mtime match what it had when last indexed."""
+        state = self._indexed_state(file_path)
+        return state is not None and state[2:] == (file_stat.st_size, file_stat.st_mtime_ns)
+
+    def confirm_unchanged(self, file_path: str, file_hash: str, file_stat: os.stat_result) -> bool:
+        """True if the file's content hash matches the index; records the new stat so the next check skips hashing."""
+        state = self._indexed_state(file_path)
+        if state is None or state[0] != file_hash:
+            return False
+        self._mark_indexed(file_path, file_hash, state[1], file_stat)
+        return True
+
+    def process_file(self, file_path: str) -> int:
+        """Index a file if it is new or changed; returns the number of chunks indexed, 0 if it was unchanged."""
         file_ext = os.path.splitext(file_path)[1].lower()
         if file_ext not in self.supported_types:
             logger.error(f"Unsupported file type: {file_path}")
             raise ValueError(f"Unsupported file type: {file_ext}")
 
-        # Check if file is already embedded and unchanged
-        file_hash = self._get_file_hash(file_path)
-        cache_path = os.path.join(self.cache_dir, f"{os.path.basename(file_path)}.pkl")
-        chunks = None
-        embeddings = None
-        metadatas = None
-
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, "rb") as f:
-                    cached_data = pickle.load(f)
-                    # Handle different cache formats
-                    if len(cached_data) == 4:
-                        cached_hash, chunks, embeddings, metadatas = cached_data
-                    elif len(cached_data) == 3:
-                        cached_hash, chunks, embeddings = cached_data
-                        metadatas = [{"file": file_path, "source": "unknown"}] * len(chunks)
-                    else:
-                        raise ValueError("Invalid cache format")
-                    
-                    if cached_hash == file_hash:
-                        logger.info(f"Using cached embeddings for unchanged file: {file_path}")
-                        return chunks
-                    else:
-                        logger.info(f"File {file_path} has changed, reprocessing...")
-            except (pickle.UnpicklingError, ValueError) as e:
-                logger.warning(f"Invalid or outdated cache for {file_path}: {str(e)}, regenerating embeddings...")
-
-        # Extract and embed if new, changed, or cache is invalid
-        chunks, metadatas = self._extract_text(file_path)
-        if not chunks:
-            return []
-        embeddings = self.embedding_service.embed_documents(chunks)
-        with open(cache_path, "wb") as f:
-            pickle.dump((file_hash, chunks, embeddings, metadatas), f)
-
-        existing_ids = self.collection.get()["ids"]
-        chunk_ids = [f"{file_path}_chunk_{i}" for i in range(len(chunks))]
-        new_ids = [cid for cid in chunk_ids if cid not in existing_ids]
-
-        if new_ids:
-            new_chunks = [chunks[i] for i in range(len(chunk_ids)) if chunk_ids[i] in new_ids]
-            new_embeddings = [embeddings[i] for i in range(len(chunk_ids)) if chunk_ids[i] in new_ids]
-            new_metadatas = [metadatas[i] for i in range(len(chunk_ids)) if chunk_ids[i] in new_ids]
-            self.collection.add(ids=new_ids, embeddings=new_embeddings, documents=new_chunks, metadatas=new_metadatas)
-            logger.info(f"Added {len(new_ids)} new chunks from {file_path} to Chroma")
-
-        return chunks
-
-    def _extract_text(self, file_path: str) -> tuple[list[str], list[dict]]:
-        if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path}")
-            return [], []
-
-        text = ""
-        metadatas = []
-        if file_path.endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8") as file:
-                text = file.read()
-            metadatas = [{"file": file_path, "source": "text"}] * (text.count("\n\n") + 1)
-        elif file_path.endswith(".pdf"):
-            reader = PdfReader(file_path)
-            for i, page in enumerate(reader.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + " "
-                    metadatas.append({"file": file_path, "source": f"page_{i+1}"})
-        elif file_path.endswith(".docx"):
-            doc = Document(file_path)
-            for i, paragraph in enumerate(doc.paragraphs):
-                if paragraph.text:
-                    text += paragraph.text + " "
-                    metadatas.append({"file": file_path, "source": f"paragraph_{i+1}"})
-        else:
-            return [], []
+        # Check if file is already indexed and unchanged; same size and mtime skips hashing entirely
+        file_stat = os.stat(file_path)
+        if self.is_unchanged(file_path, file_stat):
+            return 0
+        file_hash = get_file_hash(file_path)
+        if self.confirm_unchanged(file_path, file_hash, file_stat):
+            logger.info(f"Skipping unchanged file: {file_path}")
+            return 0
+
+        # Extract and index incrementally if new or changed
+        return self.index_chunks(file_path, file_hash, iter_chunks(file_path), file_stat)
+
+    def remove_file(self, file_path: str) -> int:
+        """Drop a file's chunks from the vector store, the lexical index and the manifest; returns the number removed."""
+        with self._file_lock(file_path):
+            existing = self.collection.get(where={"file": file_path}, include=[])
+            if existing["ids"]:
+                self.collection.delete(ids=existing["ids"])
+                self.lexical_index.delete(existing["ids"])
+            with self._manifest_lock:
+                self._manifest.execute("DELETE FROM indexed_files WHERE file_path = ?", (file_path,))
+                self._manifest.commit()
+        if existing["ids"]:
+            logger.info(f"Removed {len(existing['ids'])} chunks of deleted file {file_path} from the index")
+            self._notify_change()
+        return len(existing["ids"])
+
+    def index_chunks(self, file_path: str, file_hash: str, chunks: Iterable[tuple[str, dict]],
+                     file_stat: os.stat_result = None) -> int:
+        """Diff a stream of (chunk, metadata) against what is indexed for the file, one batch at a time:
+        reuse unchanged chunks, embed only new ones and drop chunks that no longer exist."""
+        with self._file_lock(file_path):
+            existing = self.collection.get(where={"file": file_path}, include=["metadatas"])
+            existing_metadatas = dict(zip(existing["ids"], existing["metadatas"] or []))
+            seen_ids = set()
+            occurrences = {}
+            added = 0
+            updated = 0
+            total = 0
+            batch_size = self.embedding_service.batch_size * self.embedding_service.max_concurrency
+            chunks = iter(chunks)
+            while batch := list(islice(chunks, batch_size)):
+                texts = [chunk for chunk, _ in batch]
+                metadatas = [meta for _, meta in batch]
+                chunk_ids = [self._chunk_id(file_path, text, occurrences) for text in texts]
+                seen_ids.update(chunk_ids)
+                total += len(batch)
+
+                moved_indices = [i for i, cid in enumerate(chunk_ids) if cid in existing_metadatas and existing_metadatas[cid] != metadatas[i]]
+                if moved_indices:
+                    moved_ids = [chunk_ids[i] for i in moved_indices]
+                    self.collection.update(ids=moved_ids, metadatas=[metadatas[i] for i in moved_indices])
+                    self.lexical_index.update_metadata(moved_ids, [metadatas[i] for i in moved_indices])
+                    updated += len(moved_indices)
+
+                new_indices = [i for i, cid in enumerate(chunk_ids) if cid not in existing_metadatas]
+                if new_indices:
+                    # Chunks seen before in any file are served from the shared embedding cache
+                    new_ids = [chunk_ids[i] for i in new_indices]
+                    new_texts = [texts[i] for i in new_indices]
+                    new_metadatas = [metadatas[i] for i in new_indices]
+                    new_embeddings = self.embedding_service.embed_documents(new_texts)
+                    self.collection.add(ids=new_ids, embeddings=new_embeddings, documents=new_texts, metadatas=new_metadatas)
+                    self.lexical_index.add(new_ids, new_texts, new_metadatas)
+                    added += len(new_indices)
+
+            stale_ids = [cid for cid in existing["ids"] if cid not in seen_ids]
+            if stale_ids:
+                self.collection.delete(ids=stale_ids)
+                self.lexical_index.delete(stale_ids)
+                logger.info(f"Removed {len(stale_ids)} stale chunks of {file_path} from the index")
+            if added:
+                logger.info(f"Added {added} new chunks from {file_path} to the index, reused {total - added}")
+            if added or stale_ids or updated:
+                self._notify_change()
+
+            self._mark_indexed(file_path, file_hash, total, file_stat)
+            return total
 
-        if not text.strip():
-            logger.warning(f"No text extracted from {file_path}")
-            return [], []
+    def _chunk_id(self, file_path: str, chunk: str, occurrences: dict) -> str:
+        """Content-addressed id: a chunk keeps its id as long as its text is unchanged."""
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        # Repeated identical chunks within one file get an occurrence suffix
+        return f"{file_path}_{digest}" if occurrence == 0 else f"{file_path}_{digest}_{occurrence}"
 
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=2500,  # ≈ 400-450 words ≈ 500-675 tokens ≈ 1-1.5 pages
-            chunk_overlap=250,  # ≈ 40-50 words ≈ 50-75 tokens ≈ 0.5-1 page
-            separators=["\n\n", "\n", ". ", " ", ""]
+    def search_content(self, text: str, file_paths: list[str]) -> dict[str, str]:
+        """Indexed files among file_paths with a chunk containing text, mapped to a snippet around the first hit."""
+        if not file_paths:
+            return {}
+        results = self.collection.get(
+            where={"file": {"$in": file_paths}}, where_document={"$contains": text}, include=["documents", "metadatas"]
         )
-        chunks = splitter.split_text(text)
-        if len(metadatas) > len(chunks):
-            metadatas = metadatas[:len(chunks)]
-        elif len(metadatas) < len(chunks):
-            metadatas.extend([metadatas[-1] if metadatas else {"file": file_path, "source": "unknown"}] * (len(chunks) - len(metadatas)))
-        return chunks, metadatas
-
-    def retrieve(self, query_embedding: list[float], n_results: int = 3) -> tuple[list[str], list[dict]]:
-        results = self.collection.query(query_embeddings=[query_embedding], n_results=n_results, include=["documents", "metadatas"])
-        docs = results["documents"][0] if results["documents"] else []
-        metas = results["metadatas"][0] if results["metadatas"] else []
+        snippets = {}
+        for doc, meta in zip(results["documents"] or [], results["metadatas"] or []):
+            file_path = meta.get("file") if isinstance(meta, dict) else None
+            if file_path and file_path not in snippets:
+                position = doc.find(text)
+                snippets[file_path] = doc[max(position - 100, 0):position + len(text) + 100].strip()
+        return snippets
+
+    def _vector_search(self, query_embeddings: list[list[float]], n_results: int) -> list[list[tuple[str, str, dict]]]:
+        """One multi-vector query against the vector store; returns (id, document, metadata) hits per query."""
+        results = self.collection.query(query_embeddings=query_embeddings, n_results=n_results, include=["documents", "metadatas"])
         default_meta = {"file": "unknown", "source": "unknown"}
-        cleaned_metas = [meta if isinstance(meta, dict) else default_meta for meta in metas]
-        if len(cleaned_metas) < len(docs):
-            cleaned_metas.extend([default_meta] * (len(docs) - len(cleaned_metas)))
-        elif len(cleaned_metas) > len(docs):
-            cleaned_metas = cleaned_metas[:len(docs)]
-        return docs, cleaned_metas
-
-    def load_documents(self):
-        documents_dir = "documents"
-        if not os.path.exists(documents_dir):
-            os.makedirs(documents_dir)
-            logger.warning(f"Created empty documents directory at {documents_dir}")
-            return
-        for filename in os.listdir(documents_dir):
-            file_path = os.path.join(documents_dir, filename)
-            try:
-                self.process_file(file_path)
-            except Exception as e:
-                logger.error(f"Failed to process {file_path}: {str(e)}")
\ No newline at end of file
+        hits = []
+        for i in range(len(query_embeddings)):
+            ids = results["ids"][i] if results["ids"] else []
+            docs = results["documents"][i] if results["documents"] else []
+            metas = results["metadatas"][i] if results["metadatas"] else []
+            cleaned_metas = [meta if isinstance(meta, dict) else default_meta for meta in metas]
+            if len(cleaned_metas) < len(docs):
+                cleaned_metas.extend([default_meta] * (len(docs) - len(cleaned_metas)))
+            hits.append(list(zip(ids, docs, cleaned_metas)))
+        return hits
+
+    def retrieve(self, query_embedding: list[float] | None, n_results: int = 3, query_text: str = None,
+                 timings: dict = None, rerank_text: str = None) -> tuple[list[str], list[dict]]:
+        """Dense search, BM25 search, or both fused with reciprocal-rank fusion, then reranked.
+
+        Pass query_text to add the BM25 leg and a None embedding for keyword-only search.
+        rerank_text is the query the reranker scores candidates against when query_text is not
+        given (vector-only search). Per-stage latencies in milliseconds are written to timings.
+        """
+        return self.retrieve_many(
+            [query_embedding] if query_embedding is not None else None,
+            [query_text] if query_text else None,
+            n_results, timings,
+            [rerank_text] if rerank_text else None
+        )[0]
+
+    def retrieve_many(self, query_embeddings: list[list[float]] | None, query_texts: list[str] | None,
+                      n_results: int = 3, timings: dict = None,
+                      rerank_texts: list[str] | None = None) -> list[tuple[list[str], list[dict]]]:
+        """retrieve() for many queries at once, with a single vector store query for the dense leg."""
+        timings = timings if timings is not None else {}
+        count = len(query_embeddings) if query_embeddings is not None else len(query_texts or [])
+        rerank_texts = rerank_texts or query_texts
+        # Stage one over-fetches cheaply so the reranker has recall headroom
+        reranking = self.reranker is not None and bool(rerank_texts)
+        # MMR needs a pool to diversify from, with or without a reranker
+        candidates = max(self.rerank_candidates, n_results) if reranking or self.mmr_diversity > 0 else n_results
+        # Over-fetch each leg when fusing so documents ranked lower by one leg can still surface
+        depth = max(n_results * 4, candidates) if query_embeddings is not None and query_texts else candidates
+        legs = []
+        if query_embeddings is not None:
+            start = time.perf_counter()
+            legs.append(self._vector_search(query_embeddings, depth))
+            timings["vector_ms"] = (time.perf_counter() - start) * 1000
+        if query_texts:
+            start = time.perf_counter()
+            legs.append([
+                [(cid, doc, meta) for cid, doc, meta, _ in self.lexical_index.search(query_text, depth)]
+                for query_text in query_texts
+            ])
+            timings["keyword_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        fused_hits = []
+        for i in range(count):
+            if len(legs) == 1:
+                fused = legs[0][i][:candidates]
+            else:
+                scores, hits = {}, {}
+                for leg in legs:
+                    for rank, (cid, doc, meta) in enumerate(leg[i]):
+                        scores[cid] = scores.get(cid, 0.0) + 1.0 / (RRF_K + rank + 1)
+                        hits.setdefault(cid, (cid, doc, meta))
+                fused = [hits[cid] for cid in sorted(scores, key=scores.get, reverse=True)[:candidates]]
+            fused_hits.append(fused)
+        timings["fusion_ms"] = (time.perf_counter() - start) * 1000
+
+        if candidates > n_results:
+            fused_hits = self._rerank(rerank_texts if reranking else None, fused_hits, n_results, timings)
+        results = [([doc for _, doc, _ in hits], [meta for _, _, meta in hits]) for hits in fused_hits]
+        logger.info(f"Retrieved chunks for {count} queries in " + ", ".join(f"{k}={v:.1f}" for k, v in timings.items()))
+        return results
+
+    def _rerank(self, queries: list[str] | None, candidate_hits: list[list[tuple]], n_results: int, timings: dict) -> list[list[tuple]]:
+        """Second stage: score every candidate against its query and keep the best n_results, optionally diversified.
+
+        The reranker's order is fused with the first-stage order by reciprocal rank, so a reranker
+        that misjudges a query can demote a strong dense/BM25 hit but not discard it. Without
+        queries (no reranker) the first-stage order alone feeds MMR.
+        """
+        scored = [None] * len(candidate_hits)
+        if queries:
+            start = time.perf_counter()
+            scored = [self.reranker.score(query, [doc for _, doc, _ in hits]) for query, hits in zip(queries, candidate_hits)]
+            timings["rerank_ms"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        reranked = []
+        for hits, scores in zip(candidate_hits, scored):
+            # Candidates arrive in first-stage order; the stable sort keeps it for tied rerank scores
+            fused = [1.0 / (RRF_K + j + 1) for j in range(len(hits))]
+            if scores is not None:
+                for rank, j in enumerate(sorted(range(len(hits)), key=lambda j: -scores[j])):
+                    fused[j] += 1.0 / (RRF_K + rank + 1)
+            if self.mmr_diversity > 0:
+                order = mmr([doc for _, doc, _ in hits], fused, n_results, self.mmr_diversity)
+            else:
+                order = sorted(range(len(hits)), key=lambda j: -fused[j])[:n_results]
+            reranked.append([hits[j] for j in order])
+        if self.mmr_diversity > 0:
+            timings["mmr_ms"] = (time.perf_counter() - start) * 1000
+        return reranked
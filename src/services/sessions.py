@@ -0,0 +1,51 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class SessionStore:
+    """Per-conversation state for session-aware generation, kept in memory with LRU and TTL eviction.
+
+    A session holds the Ollama context tokens returned by its last turn and the last query,
+    which is used as plain-text history when the token context has been dropped.
+    """
+
+    def __init__(self, max_sessions: int = None, ttl: float = None, max_context_tokens: int = None, token_limit: int = None):
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_SESSIONS", "256"))
+        self.ttl = ttl or float(os.getenv("SESSION_TTL", "1800"))
+        # Beyond this the conversation would crowd the model's context window, so it restarts.
+        # token_limit is what the window has room for; by default the session may use all of it
+        self.max_context_tokens = max_context_tokens or int(os.getenv("SESSION_MAX_CONTEXT_TOKENS", "0")) or token_limit or 6000
+        if token_limit is not None and self.max_context_tokens > token_limit:
+            logger.warning(f"Session context limit {self.max_context_tokens} exceeds the {token_limit} tokens the model's context window leaves; using {token_limit}")
+            self.max_context_tokens = token_limit
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str | None) -> tuple[str, dict]:
+        """The session for session_id, or a new one when it is missing, unknown or expired."""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None or now - session["updated"] > self.ttl:
+                session_id = session_id or uuid.uuid4().hex
+                session = {"context": None, "last_query": "", "turns": 0, "updated": now}
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session_id, session
+
+    def record_turn(self, session: dict, query: str, context: list[int] | None):
+        with self._lock:
+            if context and len(context) > self.max_context_tokens:
+                logger.info(f"Session context reached {len(context)} tokens; restarting it")
+                context = None
+            session["context"] = context
+            session["last_query"] = query
+            session["turns"] += 1
+            session["updated"] = time.time()
@@ -0,0 +1,238 @@
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Bytes of float32 scratch per matrix product; int8 codes are widened one block of rows at a time
+SCAN_BLOCK_BYTES = 16 << 20
+INITIAL_CAPACITY = 1024
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 codes and the scale that maps them back to floats."""
+    scales = np.abs(vectors).max(axis=1) / 127
+    codes = np.round(vectors / np.maximum(scales, 1e-12)[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+class QuantizedVectorStore:
+    """Built-in alternative to the Chroma collection, selected with VECTOR_BACKEND=quantized.
+
+    Vectors are L2-normalised (cosine space, like the Chroma collection) and kept in two
+    memory-mapped files: int8 codes with a per-row scale, scanned in full for every query
+    with one BLAS product per block, and float32 rows, read only for the top candidates to
+    re-score them exactly. Opening the store reads no vectors, and the scan touches a quarter
+    of the bytes a float index would. Ids, documents and metadata live in SQLite; slots freed
+    by deletes are reused by later adds. Implements the subset of the Chroma collection API
+    that RetrievalService uses.
+    """
+
+    def __init__(self, path: str, rescore_factor: int = None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        # Candidates from the int8 scan re-scored with exact float32 vectors, per requested result
+        self.rescore_factor = rescore_factor or int(os.getenv("QUANTIZED_RESCORE_FACTOR", "8"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, "store.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                slot INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                file TEXT,
+                metadata TEXT NOT NULL,
+                document TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks(file);
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM settings WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        slots = np.array([slot for slot, in self._conn.execute("SELECT slot FROM chunks")], dtype=np.int64)
+        # Slots past the last live row are free space; vectors written without a committed row are overwritten later
+        self._size = int(slots.max()) + 1 if len(slots) else 0
+        self._capacity = 0
+        self._codes = self._scales = self._floats = None
+        self._live = np.zeros(0, dtype=bool)
+        if self.dim:
+            codes_path = self._file("codes.i8")
+            existing = os.path.getsize(codes_path) // self.dim if os.path.exists(codes_path) else 0
+            self._remap(max(existing, self._size, INITIAL_CAPACITY))
+        self._live[slots] = True
+        self._free = np.flatnonzero(~self._live[:self._size]).tolist()[::-1]
+        logger.info(f"Opened quantized vector store at {path} with {len(slots)} vectors")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _map(self, name: str, dtype, shape: tuple) -> np.memmap:
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        path = self._file(name)
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            open(path, "ab").close()
+            os.truncate(path, size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _remap(self, capacity: int):
+        if self._codes is not None:
+            self._flush()
+        self._codes = self._map("codes.i8", np.int8, (capacity, self.dim))
+        self._scales = self._map("scales.f32", np.float32, (capacity,))
+        self._floats = self._map("vectors.f32", np.float32, (capacity, self.dim))
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self._live)] = self._live[:capacity]
+        self._live = live
+        self._capacity = capacity
+
+    def _flush(self):
+        for array in (self._codes, self._scales, self._floats):
+            array.flush()
+
+    def _allocate(self, count: int) -> np.ndarray:
+        slots = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        slots.extend(range(self._size, self._size + count - len(slots)))
+        self._size = max(self._size, slots[-1] + 1) if slots else self._size
+        if self._size > self._capacity:
+            self._remap(max(self._size, self._capacity * 2, INITIAL_CAPACITY))
+        return np.array(slots, dtype=np.int64)
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._live[:self._size].sum())
+
+    def add(self, ids: list[str], embeddings: list[list[float]], documents: list[str], metadatas: list[dict]):
+        vectors = _normalize(embeddings)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._conn.execute("INSERT INTO settings (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store's {self.dim}")
+            # Like Chroma, ids that already exist are left as they are
+            existing = self._slots(ids)
+            rows = [i for i, cid in enumerate(ids) if cid not in existing]
+            if not rows:
+                return
+            slots = self._allocate(len(rows))
+            codes, scales = _quantize(vectors[rows])
+            self._codes[slots] = codes
+            self._scales[slots] = scales
+            self._floats[slots] = vectors[rows]
+            # Vectors reach disk before the rows that make them visible
+            self._flush()
+            self._conn.executemany(
+                "INSERT INTO chunks (slot, chunk_id, file, metadata, document) VALUES (?, ?, ?, ?, ?)",
+                [(int(slot), ids[i], metadatas[i].get("file"), json.dumps(metadatas[i]), documents[i]) for slot, i in zip(slots, rows)]
+            )
+            self._conn.commit()
+            self._live[slots] = True
+
+    def update(self, ids: list[str], metadatas: list[dict]):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET file = ?, metadata = ? WHERE chunk_id = ?",
+                [(meta.get("file"), json.dumps(meta), cid) for cid, meta in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            slots = list(self._slots(ids).values())
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(cid,) for cid in ids])
+            self._conn.commit()
+            self._live[slots] = False
+            self._free.extend(slots)
+
+    def _slots(self, ids: list[str]) -> dict[str, int]:
+        slots = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT chunk_id, slot FROM chunks WHERE chunk_id IN ({', '.join('?' * len(batch))})", batch
+            ).fetchall()
+            slots.update(rows)
+        return slots
+
+    @staticmethod
+    def _where_clause(where: dict | None, where_document: dict | None) -> tuple[str, list]:
+        # Supports the filters RetrievalService uses: equality or $in on metadata fields and $contains on documents
+        clauses, params = [], []
+        for key, condition in (where or {}).items():
+            column = "file" if key == "file" else f"json_extract(metadata, '$.{key}')"
+            if isinstance(condition, dict) and "$in" in condition:
+                values = list(condition["$in"])
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0")
+                params.extend(values)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(condition)
+        if where_document and "$contains" in where_document:
+            clauses.append("instr(document, ?) > 0")
+            params.append(where_document["$contains"])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def get(self, ids: list[str] = None, where: dict = None, where_document: dict = None, limit: int = None,
+            offset: int = None, include: list[str] = ("documents", "metadatas")) -> dict:
+        clause, params = self._where_clause(where, where_document)
+        if ids is not None:
+            clause += (" AND " if clause else " WHERE ") + f"chunk_id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT chunk_id, metadata, document FROM chunks{clause} ORDER BY slot LIMIT ? OFFSET ?",
+                params + [limit if limit is not None else -1, offset or 0]
+            ).fetchall()
+        return {
+            "ids": [cid for cid, _, _ in rows],
+            "metadatas": [json.loads(meta) for _, meta, _ in rows] if "metadatas" in include else None,
+            "documents": [doc for _, _, doc in rows] if "documents" in include else None,
+        }
+
+    def query(self, query_embeddings: list[list[float]], n_results: int = 10,
+              include: list[str] = ("documents", "metadatas")) -> dict:
+        """Top n_results per query by cosine similarity: approximate int8 scan, then exact re-scoring."""
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            live = self._live[:self._size]
+            live_count = int(live.sum())
+            if not live_count or not query_embeddings:
+                for key in results:
+                    results[key] = [[] for _ in query_embeddings]
+                return results
+            queries = _normalize(query_embeddings)
+            k = min(n_results, live_count)
+            candidates = min(live_count, k * self.rescore_factor)
+            approx = np.empty((self._size, len(queries)), dtype=np.float32)
+            block_rows = max(SCAN_BLOCK_BYTES // (self.dim * 4), 1)
+            for start in range(0, self._size, block_rows):
+                end = min(start + block_rows, self._size)
+                approx[start:end] = (self._codes[start:end].astype(np.float32) @ queries.T) * self._scales[start:end, None]
+            approx[~live] = -np.inf
+            for j, query in enumerate(queries):
+                scores = approx[:, j]
+                top = np.argpartition(-scores, candidates - 1)[:candidates] if candidates < len(scores) else np.arange(len(scores))
+                top = np.sort(top[np.isfinite(scores[top])])
+                # Sorted slots keep reads of the float file sequential
+                exact = self._floats[top] @ query
+                order = np.argsort(-exact)[:k]
+                slots, similarities = top[order].tolist(), exact[order].tolist()
+                rows = dict((slot, (cid, meta, doc)) for slot, cid, meta, doc in self._conn.execute(
+                    f"SELECT slot, chunk_id, metadata, document FROM chunks WHERE slot IN ({', '.join('?' * len(slots))})", slots
+                ).fetchall())
+                hits = [(rows[slot], similarity) for slot, similarity in zip(slots, similarities) if slot in rows]
+                results["ids"].append([cid for (cid, _, _), _ in hits])
+                results["metadatas"].append([json.loads(meta) for (_, meta, _), _ in hits])
+                results["documents"].append([doc for (_, _, doc), _ in hits])
+                results["distances"].append([1 - similarity for _, similarity in hits])
+        return results
@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+from src.services.retrieval import RetrievalService
+from src.utils.logger import setup_logger
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = setup_logger()
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "FileWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.watcher.notify(event.src_path)
+        # Moves and renames report the new location separately
+        if getattr(event, "dest_path", None):
+            self.watcher.notify(event.dest_path)
+
+class FileWatcher:
+    """Keeps the retrieval index in sync with files as they change on disk.
+
+    Uses native filesystem events when watchdog is installed and falls back to polling
+    directory snapshots otherwise. Changes are debounced per path, so a file written in
+    several steps is indexed once, and then applied in the background: existing files go
+    through RetrievalService.process_file and vanished ones through remove_file.
+    """
+
+    def __init__(self, retrieval_service: RetrievalService, paths: list[str], debounce: float = None, poll_interval: float = None):
+        self.retrieval_service = retrieval_service
+        # Kept as given: indexed chunks are keyed by the path string, so it must match how ingestion names files
+        self.paths = [path for path in paths if os.path.isdir(path)]
+        self.debounce = debounce or float(os.getenv("WATCH_DEBOUNCE", "1.0"))
+        self.poll_interval = poll_interval or float(os.getenv("WATCH_POLL_INTERVAL", "5"))
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    def _is_supported(self, path: str) -> bool:
+        return os.path.splitext(path)[1].lower() in self.retrieval_service.supported_types
+
+    def notify(self, path: str):
+        if self._is_supported(path):
+            with self._lock:
+                self._pending[path] = time.monotonic()
+
+    def start(self):
+        if not self.paths:
+            return
+        self._stop.clear()
+        if Observer is not None:
+            self._observer = Observer()
+            handler = _EventHandler(self)
+            for path in self.paths:
+                self._observer.schedule(handler, path, recursive=True)
+            self._observer.start()
+            logger.info(f"Watching {self.paths} for changes")
+        else:
+            self._threads.append(threading.Thread(target=self._poll_loop, name="watcher-poll", daemon=True))
+            logger.info(f"watchdog not installed; polling {self.paths} every {self.poll_interval}s")
+        self._threads.append(threading.Thread(target=self._apply_loop, name="watcher-apply", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        stack = list(self.paths)
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file() and self._is_supported(entry.path):
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    def _poll_loop(self):
+        previous = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            for path in current.keys() | previous.keys():
+                if current.get(path) != previous.get(path):
+                    self.notify(path)
+            previous = current
+
+    def _apply_loop(self):
+        while not self._stop.wait(min(self.debounce / 2, 0.5)):
+            now = time.monotonic()
+            with self._lock:
+                ready = [path for path, changed in self._pending.items() if now - changed >= self.debounce]
+                for path in ready:
+                    del self._pending[path]
+            for path in ready:
+                try:
+                    if os.path.isfile(path):
+                        self.retrieval_service.process_file(path)
+                    else:
+                        self.retrieval_service.remove_file(path)
+                except Exception as e:
+                    logger.error(f"Failed to sync {path} with the index: {str(e)}")
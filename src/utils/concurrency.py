@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from functools import partial
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Blocking Ollama, Chroma, parsing and SQLite calls run here so they never stall the event loop
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BLOCKING_WORKERS", "16")),
+    thread_name_prefix="rag-blocking",
+)
+
+# Caps on in-flight work that is expensive for the Ollama server
+embedding_limiter = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_EMBEDDINGS", "4")))
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+async def run_limited(limiter: asyncio.Semaphore, func, *args, **kwargs):
+    async with limiter:
+        return await run_blocking(func, *args, **kwargs)
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 1
+    AUTOMATION = 2
+
+class GenerationQueueTimeout(Exception):
+    pass
+
+class GenerationScheduler:
+    """Admits generations to Ollama by priority, at most max_concurrent at a time.
+
+    Waiting requests are served interactive first, then batch, then automation, in arrival
+    order within a priority. Interactive and automation requests give up after queue_timeout
+    seconds; batch requests wait as long as it takes, since a batch queues far more items than
+    there are slots by design. Calls made with the same coalescing key while one is in flight
+    share its result instead of generating again.
+    """
+
+    def __init__(self, max_concurrent: int = None, queue_timeout: float = None):
+        # Defaults to the number of requests the Ollama server itself runs in parallel
+        self.max_concurrent = max_concurrent or int(os.getenv("MAX_CONCURRENT_GENERATIONS", os.getenv("OLLAMA_NUM_PARALLEL", "2")))
+        self.queue_timeout = queue_timeout or float(os.getenv("GENERATION_QUEUE_TIMEOUT", "60"))
+        self._active = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._inflight = {}
+
+    def status(self) -> dict:
+        return {"active": self._active, "queued": sum(not waiter.done() for _, _, waiter in self._waiting)}
+
+    async def _acquire(self, priority: Priority):
+        if self._active < self.max_concurrent and not self._waiting:
+            self._active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), waiter))
+        timeout = None if priority == Priority.BATCH else self.queue_timeout
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted as the wait ended; hand it on
+                self._release()
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                logger.warning(f"Generation request dropped after {self.queue_timeout}s in queue (priority {priority.name})")
+                raise GenerationQueueTimeout(f"Generation queue timed out after {self.queue_timeout}s")
+            raise
+
+    def _release(self):
+        self._active -= 1
+        while self._waiting:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+                break
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority):
+        """Hold a generation slot for the duration of the block, e.g. while streaming."""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def run(self, priority: Priority, func, *args, key=None, **kwargs):
+        """Run a blocking generation call in a slot; concurrent calls with the same key run it once."""
+        if key is not None and key in self._inflight:
+            logger.info("Coalesced identical in-flight generation request")
+            shared = self._inflight[key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling() or not shared.cancelled():
+                    raise
+                # Only the request being shared was cancelled, not this one: generate without it
+                return await self.run(priority, func, *args, key=key, **kwargs)
+        shared = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._inflight[key] = shared
+        try:
+            async with self.slot(priority):
+                result = await run_blocking(func, *args, **kwargs)
+            shared.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            shared.cancel()
+            raise
+        except Exception as e:
+            shared.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not reported as unhandled
+            shared.exception()
+            raise
+        finally:
+            if key is not None:
+                self._inflight.pop(key, None)
+
+generation_scheduler = GenerationScheduler()
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
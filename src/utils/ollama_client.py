@@ -0,0 +1,19 @@
+import os
+import httpx
+import ollama
+
+def _limits() -> httpx.Limits:
+    max_connections = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "16"))
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60")),
+    )
+
+def create_client(host: str) -> ollama.Client:
+    """Ollama client backed by a pooled keep-alive HTTP connection pool."""
+    return ollama.Client(host=host, limits=_limits())
+
+def create_async_client(host: str) -> ollama.AsyncClient:
+    """Async Ollama client for streaming responses, using the same pool settings."""
+    return ollama.AsyncClient(host=host, limits=_limits())
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import time
+from src.routes.rag import query_rag_batch
+from src.schema.rag import BatchQueryRequest
+
+class FakeRetrieval:
+    version = 0
+
+    def retrieve_many(self, query_embeddings, query_texts, n_results=3, timings=None, rerank_texts=None):
+        return [([f"context for {text}"], [{"file": "doc.txt"}]) for text in query_texts]
+
+class FakeGeneration:
+    def __init__(self):
+        self.started = []
+
+    def build_prompt(self, query, context):
+        return f"Context: {context}\n\nQuery: {query}"
+
+    def generate(self, query, context):
+        self.started.append(query)
+        time.sleep(0.02 if "q0" in query else 0.5)
+        return f"answer to {query}"
+
+class FakeCache:
+    def get(self, *args):
+        return None
+
+    def put(self, *args):
+        pass
+
+class FakeFileIndex:
+    version = 0
+
+class FakeHistory:
+    def __init__(self):
+        self.records = []
+
+    def record(self, *args):
+        self.records.append(args)
+
+def test_disconnect_cancels_pending_answers_and_keeps_history():
+    async def main():
+        generation, history = FakeGeneration(), FakeHistory()
+        response = await query_rag_batch(
+            BatchQueryRequest(queries=[f"q{i}" for i in range(10)], search_mode="keyword"),
+            services=(None, FakeRetrieval(), generation, None),
+            file_index=FakeFileIndex(), query_cache=FakeCache(), history_store=history,
+        )
+        stream = response.body_iterator
+        first = json.loads(await stream.__anext__())
+        # The client goes away after the first line
+        await stream.aclose()
+        await asyncio.sleep(0.7)
+        return first, generation.started, history.records
+    first, started, records = asyncio.run(main())
+    assert first["query"] == "q0"
+    assert [record[1] for record in records] == ["q0"]
+    # Only the generations already holding a slot when the client left ever ran
+    assert len(started) <= 3
@@ -0,0 +1,49 @@
+import random
+from src.services.retrieval import iter_chunks, SPLIT_WINDOW
+
+WORDS = "alpha beta gamma delta cache epsilon zeta".split()
+
+def _paragraphs(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120))) + "." for _ in range(count)]
+
+def test_chunks_cover_every_character(tmp_path):
+    source = "\n\n".join(_paragraphs(200)) + "\n"
+    assert len(source) > SPLIT_WINDOW * 2
+    path = tmp_path / "doc.txt"
+    path.write_text(source, encoding="utf-8")
+
+    covered = [False] * len(source)
+    cursor = 0
+    for chunk, meta in iter_chunks(str(path)):
+        assert meta["file"] == str(path)
+        # Chunks start on a word boundary and appear verbatim, in order, in the source
+        assert chunk.split()[0] in WORDS
+        start = source.find(chunk, cursor)
+        assert start != -1
+        covered[start:start + len(chunk)] = [True] * len(chunk)
+        cursor = start + 1
+
+    missing = [i for i, char in enumerate(source) if not covered[i] and not char.isspace()]
+    assert not missing
+
+def test_single_line_file_is_read_in_bounded_blocks(tmp_path):
+    from src.services.retrieval import _iter_segments, CHUNK_SIZE
+    source = " ".join(_paragraphs(300, seed=2))
+    assert "\n" not in source and len(source) > SPLIT_WINDOW * 3
+    path = tmp_path / "one-line.txt"
+    path.write_text(source, encoding="utf-8")
+
+    assert max(len(text) for text, _ in _iter_segments(str(path))) <= SPLIT_WINDOW
+    chunks = [chunk for chunk, _ in iter_chunks(str(path))]
+    assert all(len(chunk) <= CHUNK_SIZE for chunk in chunks)
+    covered = [False] * len(source)
+    cursor = 0
+    for chunk in chunks:
+        # The splitter keeps a ". " separator at the start of the chunk that follows it
+        assert chunk.lstrip(". ").split()[0] in WORDS
+        start = source.find(chunk, cursor)
+        assert start != -1
+        covered[start:start + len(chunk)] = [True] * len(chunk)
+        cursor = start + 1
+    assert all(covered[i] for i, char in enumerate(source) if not char.isspace())
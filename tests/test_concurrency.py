@@ -0,0 +1,37 @@
+import asyncio
+import time
+import pytest
+from src.utils.concurrency import GenerationScheduler, GenerationQueueTimeout, Priority
+
+def _generate(seconds: float, value):
+    time.sleep(seconds)
+    return value
+
+def test_batch_items_wait_past_queue_timeout():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=2, queue_timeout=0.1)
+        return await asyncio.gather(*(scheduler.run(Priority.BATCH, _generate, 0.05, i) for i in range(10)))
+    assert asyncio.run(main()) == list(range(10))
+
+def test_interactive_requests_time_out_in_queue():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=1, queue_timeout=0.05)
+        running = asyncio.create_task(scheduler.run(Priority.INTERACTIVE, _generate, 0.3, "first"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(GenerationQueueTimeout):
+            await scheduler.run(Priority.INTERACTIVE, _generate, 0, "second")
+        await running
+    asyncio.run(main())
+
+def test_followers_survive_leader_cancellation():
+    async def main():
+        scheduler = GenerationScheduler(max_concurrent=1)
+        leader = asyncio.create_task(scheduler.run(Priority.INTERACTIVE, _generate, 0.1, "answer", key="k"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(scheduler.run(Priority.INTERACTIVE, _generate, 0.1, "answer", key="k"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == "answer"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+from src.services import file_index
+from src.services.file_index import FileContentIndex
+from src.services.history_store import HistoryStore
+
+class FakeEmbedding:
+    def embed_query(self, text):
+        return [1.0, float(len(text))]
+
+def test_binary_file_is_recorded_once_and_kept_out_of_search(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.init_db()
+    index = FileContentIndex(FakeEmbedding(), store)
+    (tmp_path / "notes.txt").write_text("plain text")
+    (tmp_path / "report.pdf").write_bytes(b"%PDF-1.7\n\xff\xfe\x00binary")
+    try:
+        for name in ("notes.txt", "report.pdf"):
+            index.store_file(str(tmp_path / name))
+        hashed = []
+        monkeypatch.setattr(file_index, "get_file_hash", lambda path: hashed.append(path))
+        index.store_file(str(tmp_path / "report.pdf"))
+        assert hashed == []
+        assert index.search([1.0, 10.0], top_k=5) == ["plain text"]
+    finally:
+        store.close()
@@ -0,0 +1,52 @@
+import os
+import pytest
+from src.services.file_manager import FileManager
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setenv("ALLOWED_DIRS", str(tmp_path))
+    for relative in ("a.txt", "sub/b.txt", "sub/d.md", "sub/deep/c.txt"):
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative)
+    return tmp_path
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("*.txt", ["a.txt", "sub/b.txt", "sub/deep/c.txt"]),
+    ("sub/*.txt", ["sub/b.txt"]),
+    ("sub/*/*.txt", ["sub/deep/c.txt"]),
+    ("missing/*", []),
+])
+def test_search_patterns(tree, pattern, expected):
+    files = FileManager().search_files(str(tree), pattern)
+    assert [os.path.relpath(path, tree).replace(os.sep, "/") for path in files] == expected
+
+def test_delete_all_files_rejects_disallowed_directory(tree, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside")
+    (outside / "keep.txt").write_text("keep")
+    with pytest.raises(PermissionError):
+        FileManager().delete_all_files(str(outside))
+    assert (outside / "keep.txt").exists()
+
+def test_transfer_does_not_create_destination_when_nothing_is_valid(tree):
+    dest = tree / "new-dest"
+    results = FileManager().bulk_copy([str(tree / "missing.txt")], str(dest))
+    assert results == [{"path": str(tree / "missing.txt"), "success": False, "error": "File not found"}]
+    assert not dest.exists()
+    FileManager().bulk_copy([str(tree / "a.txt")], str(dest))
+    assert (dest / "a.txt").exists()
+
+def test_search_route_checks_allowlist_before_existence(tree, tmp_path_factory):
+    import asyncio
+    from fastapi import HTTPException
+    from src.routes.rag import search_files
+
+    services = (None, None, None, FileManager())
+    outside = tmp_path_factory.mktemp("outside")
+    for dir_path in (str(outside), str(outside / "missing")):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(search_files(dir_path, services=services))
+        assert error.value.status_code == 403
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(search_files(str(tree / "missing"), services=services))
+    assert error.value.status_code == 400
@@ -0,0 +1,27 @@
+import threading
+from src.services.history_store import HistoryStore
+
+def test_fetch_history_returns_while_writes_keep_arriving(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), flush_interval=0.05)
+    store.init_db()
+    store.record("query", "before", [], "answer")
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            store.record("query", "during", [], "answer")
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    try:
+        result = []
+        reader = threading.Thread(target=lambda: result.append(store.fetch_history(limit=1000, text="before")), daemon=True)
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+        rows, _ = result[0]
+        assert [row[2] for row in rows] == ["before"]
+    finally:
+        stop.set()
+        thread.join()
+        store.close()
@@ -0,0 +1,27 @@
+import pytest
+from src.services.intent_router import parse_intent
+
+@pytest.mark.parametrize("prompt", [
+    "Create a new file called notes.txt in /tmp/x",
+    "Remove file /tmp/a.txt if it exists",
+    "Delete all files from my docs folder",
+    "Remove files /tmp/x and all",
+    "Move a.txt to /dst",
+    "Search for files in /tmp",
+])
+def test_prose_falls_back_to_llm(prompt):
+    assert parse_intent(prompt) is None
+
+def test_paths_joined_by_commas_and_and():
+    instruction = parse_intent('Create files /p/t1.txt, /p/t2.txt and "/p/my file.txt" with content Hello')
+    assert instruction == {
+        "task": "create_file",
+        "args": {"file_paths": ["/p/t1.txt", "/p/t2.txt", "/p/my file.txt"], "content": "Hello"},
+    }
+
+def test_move_to_destination():
+    instruction = parse_intent("Move files ./a.txt and ~/b.txt to /dst")
+    assert instruction["args"] == {"file_paths": ["./a.txt", "~/b.txt"], "dest_dir": "/dst"}
+
+def test_search_needs_a_glob_or_file_name():
+    assert parse_intent("Search for *.txt in docs")["args"] == {"pattern": "*.txt", "dir_path": "docs"}
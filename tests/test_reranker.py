@@ -0,0 +1,14 @@
+from src.services.reranker import LexicalReranker, create_reranker
+
+def test_reranking_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("RERANKER", raising=False)
+    assert create_reranker() is None
+
+def test_lexical_reranker_ignores_stopwords():
+    docs = [
+        "I do not know how I would do it, do you?",
+        "To reset your password, open Settings and choose Change login credentials.",
+    ]
+    scores = LexicalReranker().score("How do I change my login credentials?", docs)
+    assert scores[0] == 0.0
+    assert scores[1] > 0.0
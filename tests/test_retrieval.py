@@ -0,0 +1,26 @@
+from src.services.retrieval import RetrievalService
+
+def _service(mmr_diversity: float) -> RetrievalService:
+    service = object.__new__(RetrievalService)
+    service.reranker, service.rerank_candidates, service.mmr_diversity = None, 10, mmr_diversity
+    docs = ["cats purr softly"] * 5 + ["dogs bark loudly", "fish swim quietly"]
+    service.requested = []
+
+    def vector_search(query_embeddings, n_results):
+        service.requested.append(n_results)
+        return [[(f"id{i}", doc, {"file": "f.txt"}) for i, doc in enumerate(docs[:n_results])]]
+    service._vector_search = vector_search
+    return service
+
+def test_mmr_runs_without_a_reranker():
+    service = _service(mmr_diversity=0.7)
+    docs, _ = service.retrieve([1.0, 0.0], n_results=3)
+    assert service.requested == [10]
+    assert docs[0] == "cats purr softly"
+    assert {"dogs bark loudly", "fish swim quietly"} <= set(docs)
+
+def test_no_overfetch_without_reranker_or_mmr():
+    service = _service(mmr_diversity=0)
+    docs, _ = service.retrieve([1.0, 0.0], n_results=3)
+    assert service.requested == [3]
+    assert docs == ["cats purr softly"] * 3
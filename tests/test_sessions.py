@@ -0,0 +1,14 @@
+from src.services.sessions import SessionStore
+
+def test_session_limit_is_capped_by_the_context_window(monkeypatch):
+    monkeypatch.setenv("SESSION_MAX_CONTEXT_TOKENS", "9000")
+    store = SessionStore(token_limit=5000)
+    assert store.max_context_tokens == 5000
+    session_id, session = store.get(None)
+    store.record_turn(session, "first", list(range(5001)))
+    # A context that no longer fits the window restarts instead of being truncated by Ollama
+    assert store.get(session_id)[1]["context"] is None
+
+def test_session_limit_defaults_to_the_context_window(monkeypatch):
+    monkeypatch.delenv("SESSION_MAX_CONTEXT_TOKENS", raising=False)
+    assert SessionStore(token_limit=5000).max_context_tokens == 5000
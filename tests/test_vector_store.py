@@ -0,0 +1,33 @@
+import numpy as np
+from src.services import vector_store
+from src.services.vector_store import QuantizedVectorStore
+
+def test_query_matches_exact_search_across_scan_blocks(tmp_path, monkeypatch):
+    # A few rows per block, so the scan crosses many block boundaries
+    monkeypatch.setattr(vector_store, "SCAN_BLOCK_BYTES", 64 * 4 * 7)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 64)).astype(np.float32)
+    store = QuantizedVectorStore(str(tmp_path))
+    store.add([f"id{i}" for i in range(500)], vectors.tolist(), [f"doc {i}" for i in range(500)],
+              [{"file": f"f{i % 5}"} for i in range(500)])
+
+    queries = vectors[[3, 250]] + 0.01 * rng.normal(size=(2, 64)).astype(np.float32)
+    results = store.query(queries.tolist(), n_results=3)
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query, ids in zip(queries, results["ids"]):
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:3]
+        assert ids == [f"id{i}" for i in expected]
+
+def test_deleted_slots_are_hidden_and_reused(tmp_path):
+    store = QuantizedVectorStore(str(tmp_path))
+    store.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], ["doc a", "doc b"], [{"file": "x"}, {"file": "y"}])
+    store.delete(["a"])
+    assert store.query([[1.0, 0.0]], n_results=2)["ids"] == [["b"]]
+    store.add(["c"], [[1.0, 0.1]], ["doc c"], [{"file": "x"}])
+    reopened = QuantizedVectorStore(str(tmp_path))
+    assert reopened.count() == 2
+    assert reopened.get(where={"file": "x"})["ids"] == ["c"]
+
+def test_rescore_factor_is_read_at_construction(tmp_path, monkeypatch):
+    monkeypatch.setenv("QUANTIZED_RESCORE_FACTOR", "3")
+    assert QuantizedVectorStore(str(tmp_path)).rescore_factor == 3
@@ -8,6 +8,82 @@ import tempfile
 # API base URL
 BASE_URL = "http://localhost:8000/rag"
 
+def response_box(content):
+    # Inline styling for response-box, theme-aware colors
+    return (
+        f"<div style='background: linear-gradient(135deg, #d4fce3 0%, #c8e6c9 100%) "
+        f"{'background: linear-gradient(135deg, #1b5e20 0%, #2e7d32 100%)' if st.get_option('theme.base') == 'dark' else ''}; "
+        f"padding: 1.5rem; border-radius: 10px; border: 1px solid #a5d6a7 "
+        f"{'border: 1px solid #4caf50' if st.get_option('theme.base') == 'dark' else ''}; "
+        f"color: #1b5e20 {'color: #e8f5e9' if st.get_option('theme.base') == 'dark' else ''}; "
+        f"font-size: 1.1rem; box-shadow: 0 4px 12px rgba(27, 94, 32, 0.1); "
+        f"margin-top: 1rem; margin-bottom: 1rem; max-height: 600px; "
+        f"font-family: Poppins, sans-serif;'>"
+        f"{content}</div>"
+    )
+
+def render_context(context):
+    # Collapsible Context with Inline Styling
+    with st.expander("Context", expanded=True):
+        context_html = (
+            f"<div style='background: linear-gradient(135deg, #e0f7fa 0%, #b2ebf2 100%) "
+            f"{'background: linear-gradient(135deg, #006064 0%, #00838f 100%)' if st.get_option('theme.base') == 'dark' else ''}; "
+            f"padding: 1.5rem; border-radius: 10px; border: 1px solid #80deea "
+            f"{'border: 1px solid #26c6da' if st.get_option('theme.base') == 'dark' else ''}; "
+            f"color: #006064 {'color: #e0f7fa' if st.get_option('theme.base') == 'dark' else ''}; "
+            f"font-size: 1rem; box-shadow: 0 4px 12px rgba(0, 96, 100, 0.1); "
+            f"margin-top: 1rem; max-height: 400px; "
+            f"font-family: Poppins, sans-serif;'>"
+        )
+        for i, ctx in enumerate(context, 1):
+            context_html += (
+                f"<p style='margin: 5px 0; padding: 8px; background-color: rgba(255, 255, 255, 0.3); "
+                f"border-radius: 5px;'><strong>Chunk {i}:</strong> {ctx.replace('\n', '<br>')}</p>"
+            )
+        context_html += "</div>"
+        html(context_html, height=400)
+
+def render_metadata(metadata):
+    # Collapsible Metadata with Inline Styling
+    with st.expander("Metadata", expanded=True):
+        meta_html = (
+            f"<div style='background: linear-gradient(135deg, #ede7f6 0%, #d1c4e9 100%) "
+            f"{'background: linear-gradient(135deg, #311b92 0%, #5e35b1 100%)' if st.get_option('theme.base') == 'dark' else ''}; "
+            f"padding: 1.5rem; border-radius: 10px; border: 1px solid #b39ddb "
+            f"{'border: 1px solid #9575cd' if st.get_option('theme.base') == 'dark' else ''}; "
+            f"color: #311b92 {'color: #ede7f6' if st.get_option('theme.base') == 'dark' else ''}; "
+            f"font-size: 0.95rem; box-shadow: 0 4px 12px rgba(49, 27, 146, 0.1); "
+            f"margin-top: 1rem; max-height: 250px; overflow-y: auto; "
+            f"font-family: Poppins, sans-serif;'>"
+            f"<table style='width: 100%; border-collapse: collapse;'>"
+            f"<tr style='background-color: rgba(255, 255, 255, 0.4);'>"
+            f"<th style='padding: 8px; border: 1px solid #fff;'>File</th>"
+            f"<th style='padding: 8px; border: 1px solid #fff;'>Source</th>"
+            f"</tr>"
+        )
+        for meta in metadata:
+            meta_html += (
+                f"<tr style='background-color: rgba(255, 255, 255, 0.3);'>"
+                f"<td style='padding: 8px; border: 1px solid #fff;'>{meta['file']}</td>"
+                f"<td style='padding: 8px; border: 1px solid #fff;'>{meta['source']}</td>"
+                f"</tr>"
+            )
+        meta_html += "</table></div>"
+        html(meta_html, height=250)
+
+def iter_sse(response):
+    # Parse a text/event-stream response into (event, data) pairs
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if event:
+                yield event, json.loads("\n".join(data))
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
 # Streamlit app
 st.title("RAG System Dashboard")
 
@@ -38,6 +114,14 @@ with tab1:
             file_paths = st.text_area("Enter file paths (one per line)", key="file_paths")
         with col_upload:
             uploaded_files = st.file_uploader("Upload files", accept_multiple_files=True, type=["txt", "pdf", "docx"])
+        col_stream, col_session = st.columns(2)
+        with col_stream:
+            stream_response = st.checkbox("Stream response", value=True, key="stream_response",
+                                          help="Show the answer as it is generated")
+        with col_session:
+            # Follow-up queries continue the same conversation until a new one is started
+            if st.button("New Conversation", key="new_conversation", help="Start a new conversation"):
+                st.session_state.pop("session_id", None)
         
         if submit_query and query:
             file_paths_list = [fp.strip() for fp in file_paths.split("\n") if fp.strip()]
@@ -47,73 +131,34 @@ with tab1:
                         tmp.write(uploaded_file.read())
                         file_paths_list.append(tmp.name)
             try:
-                response = requests.post(
-                    f"{BASE_URL}/query",
-                    json={"query": query, "file_paths": file_paths_list}
-                )
-                response.raise_for_status()
-                result = response.json()
+                payload = {"query": query, "file_paths": file_paths_list, "session_id": st.session_state.get("session_id")}
                 st.subheader("Response:")
-                # Inline styling for response-box, theme-aware colors
-                html_response = (
-                    f"<div style='background: linear-gradient(135deg, #d4fce3 0%, #c8e6c9 100%) "
-                    f"{'background: linear-gradient(135deg, #1b5e20 0%, #2e7d32 100%)' if st.get_option('theme.base') == 'dark' else ''}; "
-                    f"padding: 1.5rem; border-radius: 10px; border: 1px solid #a5d6a7 "
-                    f"{'border: 1px solid #4caf50' if st.get_option('theme.base') == 'dark' else ''}; "
-                    f"color: #1b5e20 {'color: #e8f5e9' if st.get_option('theme.base') == 'dark' else ''}; "
-                    f"font-size: 1.1rem; box-shadow: 0 4px 12px rgba(27, 94, 32, 0.1); "
-                    f"margin-top: 1rem; margin-bottom: 1rem; max-height: 600px; "
-                    f"font-family: Poppins, sans-serif;'>"
-                    f"{result['response']}</div>"
-                )
-                html(html_response, height=600, scrolling=True)
-
-                # Collapsible Context with Inline Styling
-                with st.expander("Context", expanded=True):
-                    context_html = (
-                        f"<div style='background: linear-gradient(135deg, #e0f7fa 0%, #b2ebf2 100%) "
-                        f"{'background: linear-gradient(135deg, #006064 0%, #00838f 100%)' if st.get_option('theme.base') == 'dark' else ''}; "
-                        f"padding: 1.5rem; border-radius: 10px; border: 1px solid #80deea "
-                        f"{'border: 1px solid #26c6da' if st.get_option('theme.base') == 'dark' else ''}; "
-                        f"color: #006064 {'color: #e0f7fa' if st.get_option('theme.base') == 'dark' else ''}; "
-                        f"font-size: 1rem; box-shadow: 0 4px 12px rgba(0, 96, 100, 0.1); "
-                        f"margin-top: 1rem; max-height: 400px; "
-                        f"font-family: Poppins, sans-serif;'>"
-                    )
-                    for i, ctx in enumerate(result["context"], 1):
-                        context_html += (
-                            f"<p style='margin: 5px 0; padding: 8px; background-color: rgba(255, 255, 255, 0.3); "
-                            f"border-radius: 5px;'><strong>Chunk {i}:</strong> {ctx.replace('\n', '<br>')}</p>"
-                        )
-                    context_html += "</div>"
-                    html(context_html, height=400)
-
-                # Collapsible Metadata with Inline Styling
-                with st.expander("Metadata", expanded=True):
-                    meta_html = (
-                        f"<div style='background: linear-gradient(135deg, #ede7f6 0%, #d1c4e9 100%) "
-                        f"{'background: linear-gradient(135deg, #311b92 0%, #5e35b1 100%)' if st.get_option('theme.base') == 'dark' else ''}; "
-                        f"padding: 1.5rem; border-radius: 10px; border: 1px solid #b39ddb "
-                        f"{'border: 1px solid #9575cd' if st.get_option('theme.base') == 'dark' else ''}; "
-                        f"color: #311b92 {'color: #ede7f6' if st.get_option('theme.base') == 'dark' else ''}; "
-                        f"font-size: 0.95rem; box-shadow: 0 4px 12px rgba(49, 27, 146, 0.1); "
-                        f"margin-top: 1rem; max-height: 250px; overflow-y: auto; "
-                        f"font-family: Poppins, sans-serif;'>"
-                        f"<table style='width: 100%; border-collapse: collapse;'>"
-                        f"<tr style='background-color: rgba(255, 255, 255, 0.4);'>"
-                        f"<th style='padding: 8px; border: 1px solid #fff;'>File</th>"
-                        f"<th style='padding: 8px; border: 1px solid #fff;'>Source</th>"
-                        f"</tr>"
-                    )
-                    for meta in result["metadata"]:
-                        meta_html += (
-                            f"<tr style='background-color: rgba(255, 255, 255, 0.3);'>"
-                            f"<td style='padding: 8px; border: 1px solid #fff;'>{meta['file']}</td>"
-                            f"<td style='padding: 8px; border: 1px solid #fff;'>{meta['source']}</td>"
-                            f"</tr>"
-                        )
-                    meta_html += "</table></div>"
-                    html(meta_html, height=250)
+                response_placeholder = st.empty()
+                if stream_response:
+                    with requests.post(f"{BASE_URL}/query/stream", json=payload, stream=True) as response:
+                        response.raise_for_status()
+                        response.encoding = "utf-8"
+                        tokens = []
+                        for event, data in iter_sse(response):
+                            if event == "context":
+                                st.session_state.session_id = data.get("session_id")
+                                render_context(data["context"])
+                                render_metadata(data["metadata"])
+                            elif event == "token":
+                                tokens.append(data["token"])
+                                response_placeholder.markdown(response_box("".join(tokens)), unsafe_allow_html=True)
+                            elif event in ("done", "error"):
+                                with response_placeholder.container():
+                                    html(response_box(data["response"]), height=600, scrolling=True)
+                else:
+                    response = requests.post(f"{BASE_URL}/query", json=payload)
+                    response.raise_for_status()
+                    result = response.json()
+                    st.session_state.session_id = result.get("session_id")
+                    with response_placeholder.container():
+                        html(response_box(result["response"]), height=600, scrolling=True)
+                    render_context(result["context"])
+                    render_metadata(result["metadata"])
             except requests.exceptions.RequestException as e:
                 st.error(f"Error: {str(e)}")
             finally:
@@ -148,6 +193,7 @@ with tab2:
             search_dir = st.text_input("Directory to search", key="search_dir", value="D:/temp")
         with col_pattern:
             search_pattern = st.text_input("Search pattern (e.g., *.txt)", key="search_pattern", value="*")
+        search_content = st.text_input("Containing text (optional, searches indexed files)", key="search_content")
         search_button = st.button("Search", key="search_button",
                                   help="Click to search for files",
                                   use_container_width=True)
@@ -160,11 +206,19 @@ with tab2:
             """, unsafe_allow_html=True)
         
         if search_button:
-            search_prompt = f"Search for {search_pattern} in {search_dir}"
+            search_params = {"dir_path": search_dir, "pattern": search_pattern or "*", "limit": 200}
+            if search_content.strip():
+                search_params["content"] = search_content.strip()
             try:
-                response = requests.post(f"{BASE_URL}/automate", json={"prompt": search_prompt})
+                response = requests.get(f"{BASE_URL}/files/search", params=search_params)
                 response.raise_for_status()
                 result = response.json()
+                found = "<br>".join(
+                    f"{match['path']}" + (f" &mdash; <i>{match['snippet']}</i>" if match.get("snippet") else "")
+                    for match in result["files"]
+                ) or "No files found"
+                if result["next_offset"] is not None:
+                    found += f"<br>(showing the first {len(result['files'])} results)"
                 result_html = (
                     f"<div style='background: linear-gradient(135deg, #d4fce3 0%, #c8e6c9 100%) "
                     f"{'background: linear-gradient(135deg, #1b5e20 0%, #2e7d32 100%)' if st.get_option('theme.base') == 'dark' else ''}; "
@@ -173,9 +227,9 @@ with tab2:
                     f"color: #1b5e20 {'color: #e8f5e9' if st.get_option('theme.base') == 'dark' else ''}; "
                     f"font-size: 1.1rem; box-shadow: 0 4px 12px rgba(27, 94, 32, 0.1); "
                     f"margin-top: 1rem; margin-bottom: 1rem; font-family: Poppins, sans-serif;'>"
-                    f"Search Result: {result['result']}</div>"
+                    f"Search Result:<br>{found}</div>"
                 )
-                html(result_html, height=200)
+                html(result_html, height=300, scrolling=True)
             except requests.exceptions.RequestException as e:
                 st.error(f"Error: {str(e)}")
 
@@ -202,12 +256,19 @@ with tab2:
             st.warning("Please enter an automation prompt")
 
 # Tab 3: History
+def fetch_history_page(params, cursor=None):
+    response = requests.get(f"{BASE_URL}/history", params={**params, "cursor": cursor} if cursor else params)
+    response.raise_for_status()
+    return response.json()
+
 with tab3:
     with st.container():
         st.header("Interaction History")
-        col_filter, col_refresh = st.columns([2, 1])
+        col_filter, col_search, col_refresh = st.columns([1, 2, 1])
         with col_filter:
             filter_type = st.selectbox("Filter by Type", ["All", "Query", "Automation"], key="filter_type")
+        with col_search:
+            search_text = st.text_input("Search", placeholder="Words in the query or response", key="history_search")
         with col_refresh:
             refresh_history = st.button("Refresh History", key="refresh_history",
                                         help="Click to refresh the history",
@@ -219,19 +280,32 @@ with tab3:
                     }
                 </style>
                 """, unsafe_allow_html=True)
-        
+        include_responses = st.checkbox("Include responses", value=True, key="history_include_responses",
+                                        help="Uncheck to load pages faster without the full responses")
+
+        history_params = {"limit": 20, "include_response": str(include_responses).lower()}
+        if filter_type != "All":
+            history_params["type"] = filter_type.lower()
+        if search_text.strip():
+            history_params["q"] = search_text.strip()
+
         if refresh_history:
             try:
-                response = requests.get(f"{BASE_URL}/history")
-                response.raise_for_status()
-                history = response.json()
-                if history:
-                    if filter_type != "All":
-                        history = [entry for entry in history if entry["type"].lower() == filter_type.lower()]
-                    for entry in history:
-                        with st.expander(f"{entry['type'].capitalize()} - {entry['timestamp']}", expanded=False):
-                            st.markdown(f"**Query/Prompt:** {entry['query']}")
-                            st.markdown(f"**File Paths:** {entry['file_paths']}")
+                page = fetch_history_page(history_params)
+                st.session_state.history_entries = page["entries"]
+                st.session_state.history_cursor = page["next_cursor"]
+                st.session_state.history_params = history_params
+            except requests.exceptions.RequestException as e:
+                st.error(f"Error fetching history: {str(e)}")
+
+        if "history_entries" in st.session_state:
+            history = st.session_state.history_entries
+            if history:
+                for entry in history:
+                    with st.expander(f"{entry['type'].capitalize()} - {entry['timestamp']}", expanded=False):
+                        st.markdown(f"**Query/Prompt:** {entry['query']}")
+                        st.markdown(f"**File Paths:** {entry['file_paths']}")
+                        if entry["response"] is not None:
                             # Process and render HTML response with inline styling
                             response_html = (
                                 f"<div style='background: linear-gradient(135deg, #d4fce3 0%, #c8e6c9 100%) "
@@ -246,22 +320,28 @@ with tab3:
                             )
                             st.markdown("**Response:**")
                             html(response_html, height=400, scrolling=True)
-                            if entry["details"]:
-                                st.markdown(f"**Details:** {entry['details']}")
-                else:
-                    st.info("No history available")
-            except requests.exceptions.RequestException as e:
-                st.error(f"Error fetching history: {str(e)}")
+                        if entry["details"]:
+                            st.markdown(f"**Details:** {entry['details']}")
+                if st.session_state.history_cursor and st.button("Load More", key="load_more_history"):
+                    try:
+                        page = fetch_history_page(st.session_state.history_params, st.session_state.history_cursor)
+                        st.session_state.history_entries = history + page["entries"]
+                        st.session_state.history_cursor = page["next_cursor"]
+                        st.rerun()
+                    except requests.exceptions.RequestException as e:
+                        st.error(f"Error fetching history: {str(e)}")
+            else:
+                st.info("No history available")
 
 # Sidebar Instructions
 st.sidebar.header("Instructions")
 st.sidebar.markdown("""
-- **File RAG**: Query with file paths or uploads. No input uses vector DB.
+- **File RAG**: Query with file paths or uploads. No input uses vector DB. Follow-up queries continue the conversation until you click New Conversation.
 - **File Automation**: Examples:
   - "Create files /path/test1.txt and /path/test2.txt with content Hello"
   - "Write an article to /path/article.md from vector database"
   - "Write an article to /path/article.html about AI"
   - "Search for *.txt in /path/dir"
   - "Delete all files from /path/dir"
-- **History**: Expand entries for details.
+- **History**: Filter by type or search text, expand entries for details, and load older entries page by page.
 """, unsafe_allow_html=True)
\ No newline at end of file